@@ -3,7 +3,8 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from models.user import User  # Required so Alembic detects the table
+# Required so Alembic detects the tables
+from models import user, appointment, prescription_model, drug_order, pharmacy_inventory, notification, doctor_schedule, idempotency_key, notification_outbox, notification_counter, stock_movement, email_job, token_revocation, refresh_session
 from database import Base     # Base used in your models
 
 target_metadata = Base.metadata
@@ -0,0 +1,108 @@
+"""add prescription items
+
+Revision ID: 2c811976d819
+Revises: 96dbb40de4ff
+Create Date: 2026-10-18 09:12:41.518204
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c811976d819'
+down_revision: Union[str, Sequence[str], None] = '96dbb40de4ff'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+prescriptions = sa.table(
+    'prescriptions',
+    sa.column('id', sa.Integer),
+    sa.column('drugs', sa.Text),
+)
+prescription_items = sa.table(
+    'prescription_items',
+    sa.column('prescription_id', sa.Integer),
+    sa.column('position', sa.Integer),
+    sa.column('name', sa.String),
+    sa.column('dosage', sa.String),
+    sa.column('instructions', sa.String),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('prescription_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('prescription_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('dosage', sa.String(), nullable=False),
+    sa.Column('instructions', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['prescription_id'], ['prescriptions.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_prescription_items_id'), 'prescription_items', ['id'], unique=False)
+    op.create_index(op.f('ix_prescription_items_prescription_id'), 'prescription_items', ['prescription_id'], unique=False)
+    op.create_index(op.f('ix_prescription_items_name'), 'prescription_items', ['name'], unique=False)
+
+    # Backfill line items from the JSON drug lists, one batch at a time
+    conn = op.get_bind()
+    result = conn.execute(sa.select(prescriptions.c.id, prescriptions.c.drugs).order_by(prescriptions.c.id))
+    while True:
+        rows = result.fetchmany(BATCH_SIZE)
+        if not rows:
+            break
+        items = [
+            {
+                'prescription_id': prescription_id,
+                'position': position,
+                'name': drug.get('name'),
+                'dosage': drug.get('dosage') or '',
+                'instructions': drug.get('instructions'),
+            }
+            for prescription_id, drugs in rows
+            for position, drug in enumerate(json.loads(drugs or '[]'))
+        ]
+        if items:
+            op.bulk_insert(prescription_items, items)
+
+    with op.batch_alter_table('prescriptions') as batch_op:
+        batch_op.drop_column('drugs')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('prescriptions') as batch_op:
+        batch_op.add_column(sa.Column('drugs', sa.Text(), nullable=True))
+
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.select(
+            prescription_items.c.prescription_id,
+            prescription_items.c.name,
+            prescription_items.c.dosage,
+            prescription_items.c.instructions,
+        ).order_by(prescription_items.c.prescription_id, prescription_items.c.position)
+    ).fetchall()
+    drugs = {}
+    for prescription_id, name, dosage, instructions in rows:
+        drugs.setdefault(prescription_id, []).append(
+            {'name': name, 'dosage': dosage, 'instructions': instructions}
+        )
+    for prescription_id, items in drugs.items():
+        conn.execute(
+            prescriptions.update()
+            .where(prescriptions.c.id == prescription_id)
+            .values(drugs=json.dumps(items))
+        )
+
+    op.drop_index(op.f('ix_prescription_items_name'), table_name='prescription_items')
+    op.drop_index(op.f('ix_prescription_items_prescription_id'), table_name='prescription_items')
+    op.drop_index(op.f('ix_prescription_items_id'), table_name='prescription_items')
+    op.drop_table('prescription_items')
@@ -0,0 +1,31 @@
+"""make drug order prescription unique
+
+Revision ID: 52168bade211
+Revises: 293da11cf5de
+Create Date: 2026-10-18 14:00:55.241944
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '52168bade211'
+down_revision: Union[str, Sequence[str], None] = '293da11cf5de'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fails if a prescription already has several orders; resolve those first
+    op.drop_index(op.f('ix_drug_orders_prescription_id'), table_name='drug_orders')
+    op.create_index('ix_drug_orders_prescription_id', 'drug_orders', ['prescription_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_drug_orders_prescription_id', table_name='drug_orders')
+    op.create_index(op.f('ix_drug_orders_prescription_id'), 'drug_orders', ['prescription_id'], unique=False)
@@ -0,0 +1,44 @@
+"""add email jobs
+
+Revision ID: 635a8d3f9842
+Revises: d2e84bb5c5ec
+Create Date: 2026-10-18 13:42:35.304869
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '635a8d3f9842'
+down_revision: Union[str, Sequence[str], None] = 'd2e84bb5c5ec'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('email_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('template', sa.String(), nullable=False),
+    sa.Column('to_email', sa.String(), nullable=False),
+    sa.Column('context', sa.JSON(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_email_jobs_id'), 'email_jobs', ['id'], unique=False)
+    op.create_index('ix_email_jobs_status_next_attempt_at', 'email_jobs', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_email_jobs_status_next_attempt_at', table_name='email_jobs')
+    op.drop_index(op.f('ix_email_jobs_id'), table_name='email_jobs')
+    op.drop_table('email_jobs')
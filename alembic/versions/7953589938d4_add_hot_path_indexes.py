@@ -0,0 +1,45 @@
+"""add hot path indexes
+
+Revision ID: 7953589938d4
+Revises: 2c811976d819
+Create Date: 2026-10-18 10:03:27.204615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7953589938d4'
+down_revision: Union[str, Sequence[str], None] = '2c811976d819'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, columns) - each one backs a filter + ORDER BY in the routers
+INDEXES = [
+    ('ix_appointments_doctor_id_scheduled_date_status', 'appointments', ['doctor_id', 'scheduled_date', 'status']),
+    ('ix_appointments_patient_id_scheduled_date', 'appointments', ['patient_id', 'scheduled_date']),
+    ('ix_notifications_user_id_created_at', 'notifications', ['user_id', 'created_at']),
+    ('ix_drug_orders_patient_id_created_at', 'drug_orders', ['patient_id', 'created_at']),
+    ('ix_drug_orders_prescription_id', 'drug_orders', ['prescription_id']),
+    ('ix_drug_orders_created_at', 'drug_orders', ['created_at']),
+    ('ix_prescriptions_doctor_id_issued_at', 'prescriptions', ['doctor_id', 'issued_at']),
+    ('ix_users_role_specialization', 'users', ['role', 'specialization']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY (PostgreSQL) cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
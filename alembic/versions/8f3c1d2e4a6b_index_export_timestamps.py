@@ -0,0 +1,30 @@
+"""index export timestamps
+
+Revision ID: 8f3c1d2e4a6b
+Revises: 52168bade211
+Create Date: 2026-10-18 16:20:11.502318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3c1d2e4a6b'
+down_revision: Union[str, Sequence[str], None] = '52168bade211'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_appointments_scheduled_date', 'appointments', ['scheduled_date'], unique=False)
+    op.create_index('ix_prescriptions_issued_at', 'prescriptions', ['issued_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_prescriptions_issued_at', table_name='prescriptions')
+    op.drop_index('ix_appointments_scheduled_date', table_name='appointments')
@@ -0,0 +1,60 @@
+"""add doctor schedules and appointment end
+
+Revision ID: 935dc7ce4f20
+Revises: 7953589938d4
+Create Date: 2026-10-18 11:26:05.918377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '935dc7ce4f20'
+down_revision: Union[str, Sequence[str], None] = '7953589938d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Slot length assumed for appointments booked before ends_at existed
+LEGACY_SLOT_MINUTES = 30
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('doctor_schedules',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('weekday', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.Time(), nullable=False),
+    sa.Column('end_time', sa.Time(), nullable=False),
+    sa.Column('slot_minutes', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['doctor_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_doctor_schedules_id'), 'doctor_schedules', ['id'], unique=False)
+    op.create_index(op.f('ix_doctor_schedules_doctor_id'), 'doctor_schedules', ['doctor_id'], unique=False)
+
+    op.add_column('appointments', sa.Column('ends_at', sa.DateTime(), nullable=True))
+    if op.get_bind().dialect.name == 'sqlite':
+        # keep SQLAlchemy's SQLite storage format so string comparisons stay ordered
+        op.execute(
+            "UPDATE appointments SET ends_at = "
+            f"strftime('%Y-%m-%d %H:%M:%S', scheduled_date, '+{LEGACY_SLOT_MINUTES} minutes') || '.000000' "
+            "WHERE scheduled_date IS NOT NULL"
+        )
+    else:
+        op.execute(
+            f"UPDATE appointments SET ends_at = scheduled_date + interval '{LEGACY_SLOT_MINUTES} minutes' "
+            "WHERE scheduled_date IS NOT NULL"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('appointments') as batch_op:
+        batch_op.drop_column('ends_at')
+    op.drop_index(op.f('ix_doctor_schedules_doctor_id'), table_name='doctor_schedules')
+    op.drop_index(op.f('ix_doctor_schedules_id'), table_name='doctor_schedules')
+    op.drop_table('doctor_schedules')
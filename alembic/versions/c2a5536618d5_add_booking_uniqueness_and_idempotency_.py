@@ -0,0 +1,65 @@
+"""add booking uniqueness and idempotency keys
+
+Revision ID: c2a5536618d5
+Revises: 935dc7ce4f20
+Create Date: 2026-10-18 13:23:37.812835
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2a5536618d5'
+down_revision: Union[str, Sequence[str], None] = '935dc7ce4f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE_APPOINTMENT = "status NOT IN ('cancelled', 'cancelled_by_doctor')"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('idempotency_keys',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('endpoint', sa.String(), nullable=False),
+    sa.Column('request_hash', sa.String(length=64), nullable=False),
+    sa.Column('status_code', sa.Integer(), nullable=False),
+    sa.Column('response_body', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'key', name='uq_idempotency_keys_user_id_key')
+    )
+    op.create_index(op.f('ix_idempotency_keys_id'), 'idempotency_keys', ['id'], unique=False)
+
+    op.create_index(
+        'uq_appointments_doctor_id_scheduled_date_active', 'appointments', ['doctor_id', 'scheduled_date'],
+        unique=True,
+        sqlite_where=sa.text(ACTIVE_APPOINTMENT),
+        postgresql_where=sa.text(ACTIVE_APPOINTMENT),
+    )
+    if op.get_bind().dialect.name == 'postgresql':
+        # Overlapping intervals with different start times are only caught by
+        # an exclusion constraint; it has no portable equivalent, so it lives
+        # here rather than on the model.
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        op.execute(
+            "ALTER TABLE appointments ADD CONSTRAINT ex_appointments_doctor_id_overlap "
+            "EXCLUDE USING gist (doctor_id WITH =, "
+            "tsrange(scheduled_date, coalesce(ends_at, scheduled_date)) WITH &&) "
+            f"WHERE ({ACTIVE_APPOINTMENT})"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("ALTER TABLE appointments DROP CONSTRAINT ex_appointments_doctor_id_overlap")
+    op.drop_index('uq_appointments_doctor_id_scheduled_date_active', table_name='appointments')
+    op.drop_index(op.f('ix_idempotency_keys_id'), table_name='idempotency_keys')
+    op.drop_table('idempotency_keys')
@@ -0,0 +1,61 @@
+"""add pharmacy inventory normalized name
+
+Revision ID: c5c5bbb2ce80
+Revises: b6e08104185e
+Create Date: 2026-10-18 13:32:42.093411
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from utils.drug_names import normalize_drug_name
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5c5bbb2ce80'
+down_revision: Union[str, Sequence[str], None] = 'b6e08104185e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+pharmacy_inventory = sa.table(
+    'pharmacy_inventory',
+    sa.column('id', sa.Integer),
+    sa.column('name', sa.String),
+    sa.column('normalized_name', sa.String),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('pharmacy_inventory', sa.Column('normalized_name', sa.String(), nullable=True))
+
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(pharmacy_inventory.c.id, pharmacy_inventory.c.name)).all()
+    seen = {}
+    for row in rows:
+        key = normalize_drug_name(row.name)
+        if key in seen:
+            raise RuntimeError(
+                f"Inventory items {seen[key]!r} and {row.name!r} only differ by case or spacing; "
+                "merge them before upgrading"
+            )
+        seen[key] = row.name
+        conn.execute(
+            pharmacy_inventory.update()
+            .where(pharmacy_inventory.c.id == row.id)
+            .values(normalized_name=key)
+        )
+
+    with op.batch_alter_table('pharmacy_inventory') as batch_op:
+        batch_op.alter_column('normalized_name', existing_type=sa.String(), nullable=False)
+        batch_op.create_unique_constraint('uq_pharmacy_inventory_normalized_name', ['normalized_name'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('pharmacy_inventory') as batch_op:
+        batch_op.drop_constraint('uq_pharmacy_inventory_normalized_name', type_='unique')
+        batch_op.drop_column('normalized_name')
@@ -0,0 +1,68 @@
+"""add stock ledger
+
+Revision ID: d2e84bb5c5ec
+Revises: c5c5bbb2ce80
+Create Date: 2026-10-18 13:39:50.474080
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2e84bb5c5ec'
+down_revision: Union[str, Sequence[str], None] = 'c5c5bbb2ce80'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stock_movements',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('inventory_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('quantity_change', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['drug_orders.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_stock_movements_id'), 'stock_movements', ['id'], unique=False)
+    op.create_index('ix_stock_movements_inventory_id_id', 'stock_movements', ['inventory_id', 'id'], unique=False)
+    op.create_index('ix_stock_movements_inventory_id_created_at', 'stock_movements', ['inventory_id', 'created_at'], unique=False)
+    op.create_table('stock_snapshots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('inventory_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('last_movement_id', sa.Integer(), nullable=False),
+    sa.Column('taken_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_stock_snapshots_id'), 'stock_snapshots', ['id'], unique=False)
+    op.create_index('ix_stock_snapshots_inventory_id_taken_at', 'stock_snapshots', ['inventory_id', 'taken_at'], unique=False)
+
+    # Open the ledger at the current stock levels so as-of sums match the live quantity
+    opening = sa.text(
+        "INSERT INTO stock_movements (inventory_id, kind, quantity_change, created_at) "
+        "SELECT id, 'opening', quantity, :now FROM pharmacy_inventory "
+        "WHERE quantity IS NOT NULL AND quantity <> 0"
+    ).bindparams(sa.bindparam('now', type_=sa.DateTime()))
+    op.get_bind().execute(opening, {'now': datetime.utcnow()})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_stock_snapshots_inventory_id_taken_at', table_name='stock_snapshots')
+    op.drop_index(op.f('ix_stock_snapshots_id'), table_name='stock_snapshots')
+    op.drop_table('stock_snapshots')
+    op.drop_index('ix_stock_movements_inventory_id_created_at', table_name='stock_movements')
+    op.drop_index('ix_stock_movements_inventory_id_id', table_name='stock_movements')
+    op.drop_index(op.f('ix_stock_movements_id'), table_name='stock_movements')
+    op.drop_table('stock_movements')
@@ -0,0 +1,131 @@
+# benchmarks/pagination.py
+#
+# Response time of keyset-paginated listings as the table grows.
+#
+#     python -m benchmarks.pagination [--rows 1000,10000,100000] [--requests 200]
+#
+# Orders are seeded into a throwaway SQLite database in steps; after each
+# step the first page, a page from the middle of the table (resumed from a
+# cursor) and a filtered page are timed through the app. Latency should
+# stay flat across sizes. The serialization section compares encoding one
+# page with the orjson column path against Pydantic models.
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+BENCH_DIR = tempfile.mkdtemp(prefix="smart-health-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{BENCH_DIR}/bench.db"
+os.environ["RATE_LIMITS_PER_IP"] = ""
+os.environ["RATE_LIMITS_PER_ACCOUNT"] = ""
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+
+from database import Base, SessionLocal, engine
+from models import user, appointment, prescription_model, drug_order, pharmacy_inventory, notification, doctor_schedule, idempotency_key, notification_outbox, notification_counter, stock_movement, email_job, token_revocation, refresh_session  # noqa: F401
+from models.drug_order import DrugOrder
+from schemas.drug_order import DrugOrderOut
+from utils.fast_json import FastJSONResponse, rows_response, schema_columns
+from utils.pagination import encode_cursor
+
+ADMIN = {"email": "admin@hospital.com", "password": "SuperSecure123"}
+PATIENT = {"email": "bench-patient@example.com", "password": "bench-password", "full_name": "Bench Patient"}
+
+
+def seed_orders(upto: int, patient_id: int):
+    """Grow drug_orders to `upto` rows; every other order belongs to the benchmark patient."""
+    with engine.begin() as conn:
+        start = conn.execute(text("SELECT COUNT(*) FROM drug_orders")).scalar()
+        conn.execute(text(
+            "WITH RECURSIVE n(i) AS (SELECT :start + 1 UNION ALL SELECT i + 1 FROM n WHERE i < :upto) "
+            "INSERT INTO drug_orders (prescription_id, patient_id, delivery_address, total_amount, "
+            "payment_status, order_status, created_at) "
+            "SELECT i, CASE i % 2 WHEN 0 THEN :patient_id ELSE 0 END, '12 Bench Street', i * 100, "
+            "CASE i % 3 WHEN 0 THEN 'paid' ELSE 'pending' END, "
+            "CASE i % 4 WHEN 0 THEN 'delivered' ELSE 'pending' END, "
+            "strftime('%Y-%m-%d %H:%M:%S', '2026-01-01', '+' || i || ' seconds') || '.000000' FROM n"
+        ), {"start": start, "upto": upto, "patient_id": patient_id})
+
+
+def middle_cursor() -> str:
+    with SessionLocal() as db:
+        total = db.query(DrugOrder).count()
+        row = db.execute(
+            select(DrugOrder.created_at, DrugOrder.id)
+            .order_by(DrugOrder.created_at.desc(), DrugOrder.id.desc())
+            .offset(total // 2).limit(1)
+        ).one()
+    return encode_cursor([row.created_at, row.id])
+
+
+def timed(client, requests: int, *args, **kwargs) -> tuple:
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = client.get(*args, **kwargs)
+        samples.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.text
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def bench_listings(client, sizes, requests, limit):
+    admin = {"Authorization": "Bearer " + client.post("/api/auth/login", json=ADMIN).json()["access_token"]}
+    patient_id = client.post("/api/auth/register", json=PATIENT).json()["id"]
+    patient = {"Authorization": "Bearer " + client.post("/api/auth/login", json=PATIENT).json()["access_token"]}
+
+    print(f"{'rows':>9}  {'listing':<34} {'p50 ms':>8} {'p95 ms':>8}")
+    for size in sizes:
+        seed_orders(size, patient_id)
+        cursor = middle_cursor()
+        cases = [
+            ("admin orders, first page", "/api/pharmacy/orders", admin, {}),
+            ("admin orders, middle page", "/api/pharmacy/orders", admin, {"cursor": cursor}),
+            ("admin orders, status filter", "/api/pharmacy/orders", admin, {"order_status": "delivered"}),
+            ("my orders, first page", "/api/pharmacy/orders/my", patient, {}),
+            ("my orders, middle page", "/api/pharmacy/orders/my", patient, {"cursor": cursor}),
+        ]
+        for label, path, headers, params in cases:
+            p50, p95 = timed(client, requests, path, params={"limit": limit, **params}, headers=headers)
+            print(f"{size:>9}  {label:<34} {p50:>8.2f} {p95:>8.2f}")
+
+
+def bench_serialization(limit: int, repeat: int = 200):
+    with SessionLocal() as db:
+        rows = db.execute(select(*schema_columns(DrugOrder, DrugOrderOut)).limit(limit)).all()
+        orders = db.scalars(select(DrugOrder).limit(limit)).all()
+
+    def column_path():
+        rows_response(rows).body
+
+    def pydantic_path():
+        FastJSONResponse(jsonable_encoder([DrugOrderOut.model_validate(order) for order in orders])).body
+
+    print(f"\nencoding one page of {limit} orders")
+    for label, encode in (("orjson column rows", column_path), ("pydantic models", pydantic_path)):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            encode()
+        print(f"  {label:<20} {(time.perf_counter() - started) / repeat * 1000:>8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark keyset pagination as the orders table grows")
+    parser.add_argument("--rows", default="1000,10000,100000", help="comma-separated table sizes")
+    parser.add_argument("--requests", type=int, default=200, help="requests timed per listing and size")
+    parser.add_argument("--limit", type=int, default=50, help="page size")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    from main import app
+
+    with TestClient(app) as client:
+        bench_listings(client, sorted(int(size) for size in args.rows.split(",")), args.requests, args.limit)
+    bench_serialization(args.limit)
+
+
+if __name__ == "__main__":
+    main()
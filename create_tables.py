@@ -1,7 +1,7 @@
 # create_tables.py
 
 from database import Base, engine
-from models import user, appointment, prescription_model, drug_order, pharmacy_inventory
+from models import user, appointment, prescription_model, drug_order, pharmacy_inventory, notification, doctor_schedule, idempotency_key, notification_outbox, notification_counter, stock_movement, email_job, token_revocation, refresh_session
 
 print("Creating tables...")
 Base.metadata.create_all(bind=engine)
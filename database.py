@@ -1,6 +1,10 @@
 # database.py
 
-from sqlalchemy import create_engine
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 from dotenv import load_dotenv
@@ -11,22 +15,90 @@ load_dotenv()
 # Get database URL from .env
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./health.db")
 
+# Connection pool settings (pool size / overflow are ignored for SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+
+
+def to_async_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto the matching asyncio driver."""
+    scheme, sep, rest = url.partition("://")
+    backend = scheme.split("+", 1)[0]
+    drivers = {
+        "sqlite": "sqlite+aiosqlite",
+        "postgres": "postgresql+asyncpg",
+        "postgresql": "postgresql+asyncpg",
+        "mysql": "mysql+aiomysql",
+    }
+    return drivers.get(backend, scheme) + sep + rest
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
 # SQLite-specific setting
 connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
 
-# Create engine
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+
+def _pool_options(url: str) -> dict:
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    if not url.startswith("sqlite"):
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+    return options
+
+
+# Create engine (scripts, migrations and startup hooks)
+engine = create_engine(DATABASE_URL, connect_args=connect_args, **_pool_options(DATABASE_URL))
+
+# Create async engine (request handlers)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, connect_args=connect_args, **_pool_options(ASYNC_DATABASE_URL))
 
 # Create session
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+class RequestDBStats:
+    """Per-request database counters, installed by the request middleware."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+request_db_stats: ContextVar[RequestDBStats | None] = ContextVar("request_db_stats", default=None)
+
+
+@event.listens_for(async_engine.sync_engine, "checkout")
+def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+    stats = request_db_stats.get()
+    if stats is not None:
+        stats.checkouts += 1
+
+
+# Both engines, so queries from sync helpers inside a request are counted too
+@event.listens_for(engine, "before_cursor_execute")
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if request_db_stats.get() is not None:
+        context._query_started_at = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+@event.listens_for(async_engine.sync_engine, "after_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    stats = request_db_stats.get()
+    started = getattr(context, "_query_started_at", None)
+    if stats is not None and started is not None:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
 
 # Base model class for SQLAlchemy
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
-
@@ -0,0 +1,32 @@
+# email_worker.py
+#
+# Sends queued emails (the email_jobs table). Run it next to the API, as many
+# copies as needed; each claims its own batches:
+#
+#     python email_worker.py
+#     EMAIL_TRANSPORT=smtp SMTP_PORT=1025 python email_worker.py   # local SMTP sink
+
+import argparse
+import asyncio
+import logging
+
+from models import user  # noqa: F401  (registers every table the models refer to)
+from services.email_worker import EMAIL_BATCH_SIZE, run_email_worker
+from utils.email import EMAIL_TRANSPORT, TRANSPORTS, get_transport
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send queued emails.")
+    parser.add_argument("--transport", choices=sorted(TRANSPORTS), default=EMAIL_TRANSPORT)
+    parser.add_argument("--batch-size", type=int, default=EMAIL_BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(run_email_worker(get_transport(args.transport), args.batch_size))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# import_inventory.py
+#
+# Bulk-load pharmacy inventory from a CSV or NDJSON file, the same format as
+# POST /api/pharmacy/inventory/bulk:
+#
+#     python import_inventory.py formulary.csv
+#     python import_inventory.py restock.ndjson --format ndjson
+
+import argparse
+import asyncio
+import sys
+import time
+
+from database import AsyncSessionLocal
+from models import user, appointment, prescription_model, drug_order  # noqa: F401  (registers every table the models refer to)
+from services.inventory_import import ImportAborted, import_inventory
+
+
+async def read_lines(path: str):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for line in f:
+            yield line.rstrip("\r\n")
+
+
+async def run(path: str, fmt: str):
+    started = time.monotonic()
+    aborted = None
+    async with AsyncSessionLocal() as db:
+        try:
+            report = await import_inventory(db, read_lines(path), fmt)
+        except ImportAborted as exc:
+            report, aborted = exc.report, exc
+    elapsed = time.monotonic() - started
+
+    for error in report.errors:
+        print(f"line {error['line']}: {error['name'] or ''}: {error['error']}")
+    if aborted is not None:
+        sys.exit(f"Database error: {aborted.__cause__}\n"
+                 f"Rows through line {report.committed_through_line} were applied; "
+                 f"resubmit the rest of the file.")
+    print(f"Done. {report.processed} rows, {report.upserted} upserted, {report.failed} failed "
+          f"in {elapsed:.1f}s ({report.processed / max(elapsed, 1e-9):.0f} rows/sec).")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import pharmacy inventory.")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "ndjson"],
+                        help="defaults to the file extension")
+    args = parser.parse_args()
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    asyncio.run(run(args.path, fmt))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,32 @@
 # backend/main.py
+import asyncio
+import logging
+import time
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import auth, appointments, admin, prescriptions, pharmacy, doctors
+from routers import auth, appointments, admin, prescriptions, pharmacy, doctors, notifications, exports
 # Import routers (to be created)
 # from routers import auth, appointments, prescriptions, pharmacy, admin, ml_classify
-from database import SessionLocal
+from database import SessionLocal, RequestDBStats, async_engine, request_db_stats
 from models.user import User
 from utils.hashing import get_password_hash
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from fastapi import Request
+from utils.metrics import Counter, Gauge, Histogram, render_latest
+from services.notification_dispatcher import run_dispatcher
+from utils.pubsub import hub
+from utils.rate_limit import AuthRateLimitMiddleware
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
+# Added first so CORS headers also reach its 429 responses
+app.add_middleware(AuthRateLimitMiddleware)
+
 # Allow CORS for Next.js frontend
 app.add_middleware(
     CORSMiddleware,
@@ -21,7 +34,79 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-DB-Queries"],
+)
+
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight",
+    "Requests currently being served",
+)
+http_requests_total = Counter(
+    "http_requests_total",
+    "Requests served, by route template and status code",
+    ["method", "route", "status"],
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds",
+    "Time until the response headers were ready, by route template",
+    ["method", "route"],
 )
+db_queries_per_request = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed while serving one request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+db_seconds_per_request = Histogram(
+    "db_seconds_per_request",
+    "Time spent executing SQL while serving one request",
+    ["route"],
+)
+db_checkouts_per_request = Histogram(
+    "db_connection_checkouts_per_request",
+    "Pooled connections checked out while serving one request",
+    buckets=(0, 1, 2, 3, 5, 10),
+)
+db_pool_checked_out = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the async engine pool",
+)
+
+
+def route_template(request: Request) -> str:
+    """Path template of the matched route, e.g. /api/appointments/{appointment_id}."""
+    # Routes of included routers only know their path relative to the prefix;
+    # FastAPI keeps the full one on the effective route context
+    context = request.scope.get("fastapi", {}).get("effective_route_context")
+    path = getattr(context, "path_format", None) or getattr(request.scope.get("route"), "path", None)
+    return path or "unmatched"
+
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    stats = RequestDBStats()
+    token = request_db_stats.set(stats)
+    http_requests_in_flight.inc()
+    started = time.perf_counter()
+    status_code = 500  # unless a response comes back
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        elapsed = time.perf_counter() - started
+        request_db_stats.reset(token)
+        http_requests_in_flight.dec()
+        # Route templates keep label cardinality bounded; unknown paths share one label
+        route = route_template(request)
+        http_requests_total.inc(method=request.method, route=route, status=status_code)
+        http_request_duration_seconds.observe(elapsed, method=request.method, route=route)
+        db_queries_per_request.observe(stats.queries, route=route)
+        db_seconds_per_request.observe(stats.db_seconds, route=route)
+        db_checkouts_per_request.observe(stats.checkouts)
+        db_pool_checked_out.set(async_engine.pool.checkedout())
+    response.headers["X-DB-Checkouts"] = str(stats.checkouts)
+    response.headers["X-DB-Queries"] = str(stats.queries)
+    return response
 
 
 @app.on_event("startup")
@@ -41,12 +126,25 @@ def create_default_admin():
     db.close()
 
 
+@app.on_event("startup")
+async def start_notification_dispatcher():
+    app.state.notification_dispatcher = asyncio.create_task(run_dispatcher())
+
+
+@app.on_event("shutdown")
+async def stop_notification_dispatcher():
+    app.state.notification_dispatcher.cancel()
+    await hub.close()
+
+
 # Include all routers
 app.include_router(auth.router, prefix="/api/auth")
 app.include_router(appointments.router)
 app.include_router(prescriptions.router)
 app.include_router(pharmacy.router)
 app.include_router(admin.router)
+app.include_router(exports.router)
+app.include_router(notifications.router)
 # app.include_router(ml_classify.router, prefix="/api/ml")
 app.include_router(doctors.router, prefix="/api")  # mount it
 
@@ -56,23 +154,30 @@ def root():
     return {"message": "Smart Health System Backend is running"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(render_latest(), media_type="text/plain; version=0.0.4")
+
+
 
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     return JSONResponse(
         status_code=exc.status_code,
         content={"error": exc.detail},
+        headers=getattr(exc, "headers", None),
     )
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     return JSONResponse(
         status_code=422,
-        content={"error": "Validation error", "details": exc.errors()},
+        content={"error": "Validation error", "details": jsonable_encoder(exc.errors())},
     )
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
+    logger.exception("Unhandled error on %s %s", request.method, request.url.path, exc_info=exc)
     return JSONResponse(
         status_code=500,
         content={"error": "Something went wrong"},
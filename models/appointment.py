@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -21,6 +21,9 @@ class AppointmentOut(BaseModel):
 
     # models/appointment.py
 
+ACTIVE_APPOINTMENT = text("status NOT IN ('cancelled', 'cancelled_by_doctor')")
+
+
 class Appointment(Base):
     __tablename__ = "appointments"
 
@@ -28,6 +31,7 @@ class Appointment(Base):
     doctor_id = Column(Integer, ForeignKey("users.id"))
     patient_id = Column(Integer, ForeignKey("users.id"))
     scheduled_date = Column(DateTime)
+    ends_at = Column(DateTime, nullable=True)
     reason = Column(String)
     status = Column(String, default="pending")  # <-- new
     prescription = Column(String, nullable=True)  # <-- new
@@ -35,4 +39,21 @@ class Appointment(Base):
 
     doctor = relationship("User", foreign_keys=[doctor_id])
     patient = relationship("User", foreign_keys=[patient_id])
-    prescription = relationship("Prescription", back_populates="appointment", uselist=False)
+    # noload: AppointmentOut reads `prescription`, which must not lazy-load under AsyncSession
+    prescription = relationship("Prescription", back_populates="appointment", uselist=False, lazy="noload")
+
+    __table_args__ = (
+        # double-booking check and the doctor's schedule listing
+        Index("ix_appointments_doctor_id_scheduled_date_status", "doctor_id", "scheduled_date", "status"),
+        Index("ix_appointments_patient_id_scheduled_date", "patient_id", "scheduled_date"),
+        # date-filtered appointment exports
+        Index("ix_appointments_scheduled_date", "scheduled_date"),
+        # one active booking per doctor and slot start; overlapping starts are
+        # serialized by services.scheduling.lock_doctor, this is a backstop
+        Index(
+            "uq_appointments_doctor_id_scheduled_date_active", "doctor_id", "scheduled_date",
+            unique=True,
+            sqlite_where=ACTIVE_APPOINTMENT,
+            postgresql_where=ACTIVE_APPOINTMENT,
+        ),
+    )
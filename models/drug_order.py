@@ -1,5 +1,5 @@
 # models/drug_order.py
-from sqlalchemy import Column, Integer, ForeignKey, String, DateTime, Text
+from sqlalchemy import Column, Integer, ForeignKey, String, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
@@ -18,3 +18,10 @@ class DrugOrder(Base):
 
     prescription = relationship("Prescription")
     patient = relationship("User")
+
+    __table_args__ = (
+        Index("ix_drug_orders_patient_id_created_at", "patient_id", "created_at"),
+        # One order per prescription; also settles concurrent orders for it
+        Index("ix_drug_orders_prescription_id", "prescription_id", unique=True),
+        Index("ix_drug_orders_created_at", "created_at"),
+    )
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index
+from database import Base
+from datetime import datetime
+
+
+class EmailJob(Base):
+    """
+    Outgoing email, queued in the same transaction as the request that
+    caused it and delivered by email_worker.py.
+    """
+    __tablename__ = "email_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    template = Column(String, nullable=False)
+    to_email = Column(String, nullable=False)
+    context = Column(JSON, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    # When the job may next be claimed; pushed forward while a worker holds it
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_jobs_status_next_attempt_at", "status", "next_attempt_at"),
+    )
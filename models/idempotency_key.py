@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, ForeignKey, String, Text, DateTime, UniqueConstraint
+from database import Base
+from datetime import datetime
+
+
+class IdempotencyKey(Base):
+    """Response of a POST made with an Idempotency-Key, replayed on retries."""
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    key = Column(String(255), nullable=False)
+    endpoint = Column(String, nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_id_key"),
+    )
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from database import Base
+
+
+class NotificationCounter(Base):
+    """Denormalized unread count per user, kept in step with notifications.is_read."""
+    __tablename__ = "notification_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    unread_count = Column(Integer, nullable=False, default=0)
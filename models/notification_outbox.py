@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+from database import Base
+from datetime import datetime
+
+
+class NotificationOutbox(Base):
+    """
+    Notification events written in the same transaction as the change that
+    caused them. The dispatcher turns each one into a notifications row per
+    recipient and deletes it.
+    """
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipient_ids = Column(JSON, nullable=False)
+    message = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,9 +1,18 @@
 from sqlalchemy import Column, Integer, String
+from sqlalchemy.orm import validates
 from database import Base
+from utils.drug_names import normalize_drug_name
 
 class PharmacyInventory(Base):
     __tablename__ = "pharmacy_inventory"
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, nullable=False)  # Drug name
+    # Matching key for search and prescriptions: "Paracetamol " == "paracetamol"
+    normalized_name = Column(String, unique=True, nullable=False)
     quantity = Column(Integer, default=0)  # Quantity in stock
+
+    @validates("name")
+    def _set_normalized_name(self, key, name):
+        self.normalized_name = normalize_drug_name(name)
+        return name
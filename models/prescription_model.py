@@ -1,8 +1,7 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Text, UniqueConstraint
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
-import json
 
 
 class Prescription(Base):
@@ -11,22 +10,40 @@ class Prescription(Base):
     id = Column(Integer, primary_key=True, index=True)
     appointment_id = Column(Integer, ForeignKey("appointments.id"), nullable=False)
     doctor_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    drugs = Column(Text, nullable=False)
     issued_at = Column(DateTime, default=datetime.utcnow)
 
     appointment = relationship("Appointment", back_populates="prescription")
     doctor = relationship("User")
+    # lazy="raise": queries must selectinload items so list endpoints stay at one extra query
+    items = relationship(
+        "PrescriptionItem",
+        back_populates="prescription",
+        order_by="PrescriptionItem.position",
+        cascade="all, delete-orphan",
+        lazy="raise",
+    )
 
     __table_args__ = (
         UniqueConstraint('appointment_id', name='unique_prescription_per_appointment'),
+        Index('ix_prescriptions_doctor_id_issued_at', 'doctor_id', 'issued_at'),
+        # date-filtered prescription exports
+        Index('ix_prescriptions_issued_at', 'issued_at'),
     )
 
+    @property
+    def drugs(self):
+        # PrescriptionOut.drugs is served straight from the line items
+        return self.items
+
+
+class PrescriptionItem(Base):
+    __tablename__ = "prescription_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    prescription_id = Column(Integer, ForeignKey("prescriptions.id", ondelete="CASCADE"), nullable=False, index=True)
+    position = Column(Integer, nullable=False, default=0)
+    name = Column(String, nullable=False, index=True)
+    dosage = Column(String, nullable=False)
+    instructions = Column(String, nullable=True)
 
-def as_dict(self):
-        return {
-            "id": self.id,
-            "appointment_id": self.appointment_id,
-            "doctor_id": self.doctor_id,
-            "drugs": json.loads(self.drugs),
-            "issued_at": self.issued_at
-        }
\ No newline at end of file
+    prescription = relationship("Prescription", back_populates="items")
@@ -0,0 +1,42 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from database import Base
+from datetime import datetime
+
+
+class StockMovement(Base):
+    """
+    Append-only ledger of inventory changes. Every change to
+    PharmacyInventory.quantity writes one row in the same transaction.
+
+    inventory_id is deliberately not a foreign key: the history of a
+    deleted item is kept.
+    """
+    __tablename__ = "stock_movements"
+
+    id = Column(Integer, primary_key=True, index=True)
+    inventory_id = Column(Integer, nullable=False)
+    kind = Column(String, nullable=False)  # opening, receipt, adjustment, dispense, return, removal
+    quantity_change = Column(Integer, nullable=False)
+    order_id = Column(Integer, ForeignKey("drug_orders.id"), nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_stock_movements_inventory_id_id", "inventory_id", "id"),
+        Index("ix_stock_movements_inventory_id_created_at", "inventory_id", "created_at"),
+    )
+
+
+class StockSnapshot(Base):
+    """Stock level of an item after ledger row `last_movement_id`, written by snapshot_stock.py."""
+    __tablename__ = "stock_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    inventory_id = Column(Integer, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    last_movement_id = Column(Integer, nullable=False)
+    taken_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_stock_snapshots_inventory_id_taken_at", "inventory_id", "taken_at"),
+    )
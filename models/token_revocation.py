@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from database import Base
+from datetime import datetime
+
+
+class TokenRevocation(Base):
+    """
+    A revoked token (jti set) or every token of a subject issued before
+    revoked_at (subject set). Rows are ignored once expires_at passes, as
+    no token they cover can still be valid.
+    """
+    __tablename__ = "token_revocations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String, nullable=True, index=True)
+    subject = Column(String, nullable=True)
+    revoked_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_token_revocations_expires_at", "expires_at"),
+    )
@@ -1,6 +1,6 @@
 # models/user.py
 
-from sqlalchemy import Column, String, Boolean, Integer
+from sqlalchemy import Column, String, Boolean, Integer, Index
 from database import Base
 
 class User(Base):
@@ -13,3 +13,8 @@ class User(Base):
     role = Column(String, nullable=False)
     specialization = Column(String, nullable=True)  # 👈 Add this
     is_active = Column(Boolean, default=True)
+
+    __table_args__ = (
+        # doctor directory filtered by specialization
+        Index("ix_users_role_specialization", "role", "specialization"),
+    )
@@ -0,0 +1,71 @@
+# prune_idempotency_keys.py
+#
+# Deletes stored Idempotency-Key responses older than their TTL. Retries
+# past the TTL are treated as new requests anyway, so the rows are dead
+# weight. Rows are deleted in short batches, each in its own transaction.
+# Run it from cron alongside the app, e.g.
+#
+#     python prune_idempotency_keys.py --hours 24 --batch-size 1000
+
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+
+from database import SessionLocal
+from models import user  # noqa: F401  (registers the users table for the foreign keys)
+from models.idempotency_key import IdempotencyKey
+from utils.idempotency import IDEMPOTENCY_KEY_TTL_HOURS
+
+IDEMPOTENCY_PRUNE_BATCH_SIZE = int(os.getenv("IDEMPOTENCY_PRUNE_BATCH_SIZE", 1000))
+
+
+def prune(hours: int, batch_size: int, pause: float = 0.0) -> int:
+    cutoff = datetime.utcnow() - timedelta(hours=hours)
+    deleted = 0
+    last_id = 0
+    started = time.monotonic()
+
+    # Walk the primary key once instead of re-scanning for old rows each batch
+    while True:
+        with SessionLocal() as db:
+            ids = db.scalars(
+                select(IdempotencyKey.id)
+                .where(IdempotencyKey.id > last_id, IdempotencyKey.created_at < cutoff)
+                .order_by(IdempotencyKey.id)
+                .limit(batch_size)
+            ).all()
+            if not ids:
+                break
+
+            db.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(ids)))
+            db.commit()
+
+        deleted += len(ids)
+        last_id = ids[-1]
+        elapsed = time.monotonic() - started
+        print(f"Deleted {deleted} idempotency keys ({deleted / elapsed:.0f} rows/sec), last id {last_id}")
+        if pause:
+            time.sleep(pause)
+
+    return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete expired Idempotency-Key responses.")
+    parser.add_argument("--hours", type=int, default=IDEMPOTENCY_KEY_TTL_HOURS,
+                        help="keep responses newer than this many hours")
+    parser.add_argument("--batch-size", type=int, default=IDEMPOTENCY_PRUNE_BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    args = parser.parse_args()
+
+    print(f"Pruning idempotency keys older than {args.hours} hours...")
+    started = time.monotonic()
+    deleted = prune(args.hours, args.batch_size, pause=args.pause)
+    print(f"Done. {deleted} idempotency keys in {time.monotonic() - started:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# prune_notifications.py
+#
+# Moves read notifications older than the retention period into
+# notifications_archive (or deletes them with --delete). Rows are handled in
+# short batches, each in its own transaction, so the live table is never
+# locked for long. Run it from cron alongside the app, e.g.
+#
+#     python prune_notifications.py --days 90 --batch-size 1000
+
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select
+
+from database import SessionLocal
+from models import user  # noqa: F401  (registers the users table for the foreign keys)
+from models.notification import Notification, NotificationArchive
+
+NOTIFICATION_RETENTION_DAYS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", 90))
+NOTIFICATION_PRUNE_BATCH_SIZE = int(os.getenv("NOTIFICATION_PRUNE_BATCH_SIZE", 1000))
+
+
+def prune(days: int, batch_size: int, archive: bool = True, pause: float = 0.0) -> int:
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    moved = 0
+    last_id = 0
+    started = time.monotonic()
+
+    # Walk the primary key once instead of re-scanning for old rows each batch
+    while True:
+        with SessionLocal() as db:
+            ids = db.scalars(
+                select(Notification.id)
+                .where(Notification.id > last_id, Notification.is_read == 1, Notification.created_at < cutoff)
+                .order_by(Notification.id)
+                .limit(batch_size)
+            ).all()
+            if not ids:
+                break
+
+            if archive:
+                db.execute(insert(NotificationArchive).from_select(
+                    ["id", "user_id", "message", "is_read", "created_at"],
+                    select(Notification.id, Notification.user_id, Notification.message,
+                           Notification.is_read, Notification.created_at)
+                    .where(Notification.id.in_(ids)),
+                ))
+            db.execute(delete(Notification).where(Notification.id.in_(ids)))
+            db.commit()
+
+        moved += len(ids)
+        last_id = ids[-1]
+        elapsed = time.monotonic() - started
+        print(f"{'Archived' if archive else 'Deleted'} {moved} notifications "
+              f"({moved / elapsed:.0f} rows/sec), last id {last_id}")
+        if pause:
+            time.sleep(pause)
+
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive or delete old read notifications.")
+    parser.add_argument("--days", type=int, default=NOTIFICATION_RETENTION_DAYS,
+                        help="keep read notifications newer than this many days")
+    parser.add_argument("--batch-size", type=int, default=NOTIFICATION_PRUNE_BATCH_SIZE)
+    parser.add_argument("--delete", action="store_true", help="delete instead of moving to notifications_archive")
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    args = parser.parse_args()
+
+    print(f"Pruning read notifications older than {args.days} days...")
+    started = time.monotonic()
+    moved = prune(args.days, args.batch_size, archive=not args.delete, pause=args.pause)
+    print(f"Done. {moved} notifications in {time.monotonic() - started:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,80 @@
 # routers/admin.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from routers.auth import UserCreate, get_password_hash
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from routers.auth import UserCreate
 from models.user import User
-from database import get_db
-from utils.dependencies import get_current_admin, get_current_user
+from utils.dependencies import get_db, get_current_admin
 from schemas.user import UserOut
+from utils.hashing import get_password_hash_async
+from utils.fast_json import FastJSONResponse, rows_response, schema_columns
+from utils.pagination import PageParams, paginate
+from utils.tokens import revoke_subject
+from services.refresh_sessions import revoke_user_sessions
 
 router = APIRouter(
     prefix="/api/admin",
     tags=["Admin"]
 )
 
-def verify_admin(user: User = Depends(get_current_user)):
-    if user.role != "admin":
-        raise HTTPException(status_code=403, detail="Admins only")
-    return user
+USER_COLUMNS = schema_columns(User, UserOut)
+
 
-@router.get("/doctors", response_model=list[UserOut])
-def list_doctors(
-    db: Session = Depends(get_db),
-    _: User = Depends(verify_admin)
+@router.get("/doctors", response_model=list[UserOut], response_class=FastJSONResponse)
+async def list_doctors(
+    response: Response,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(get_current_admin)
 ):
-    return db.query(User).filter(User.role == "doctor").all()
+    rows = await paginate(db, select(*USER_COLUMNS).where(User.role == "doctor"), (User.id,), page, response)
+    return rows_response(rows, response)
 
-@router.get("/patients", response_model=list[UserOut])
-def list_patients(
-    db: Session = Depends(get_db),
-    _: User = Depends(verify_admin)
+@router.get("/patients", response_model=list[UserOut], response_class=FastJSONResponse)
+async def list_patients(
+    response: Response,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(get_current_admin)
 ):
-    return db.query(User).filter(User.role == "patient").all()
+    rows = await paginate(db, select(*USER_COLUMNS).where(User.role == "patient"), (User.id,), page, response)
+    return rows_response(rows, response)
 
 @router.post("/create-doctor", response_model=UserOut)
-def create_doctor(
+async def create_doctor(
     user: UserCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(get_current_admin)
 ):
-    if current_user.role != "admin":
-        raise HTTPException(status_code=403, detail="Only admin can create doctor accounts")
-
-    existing_user = db.query(User).filter(User.email == user.email).first()
+    existing_user = await db.scalar(select(User).where(User.email == user.email))
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
     new_user = User(
         full_name=user.full_name,
         email=user.email,
-        hashed_password=get_password_hash(user.password),
+        hashed_password=await get_password_hash_async(user.password, endpoint="create-doctor"),
         role="doctor",
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
+
+
+@router.post("/users/{user_id}/deactivate", response_model=UserOut)
+async def deactivate_user(
+    user_id: int,
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(get_current_admin)
+):
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    user.is_active = False
+    # Outstanding tokens stop working on every worker within one refresh interval
+    revoke_subject(db, user.email)
+    await revoke_user_sessions(db, user.id)
+    await db.commit()
+    return user
@@ -1,18 +1,24 @@
 # backend/routers/appointments.py
 
-from fastapi import APIRouter, Depends, HTTPException, Path
-from sqlalchemy import and_
-from sqlalchemy.orm import Session
-from database import get_db
-from utils.dependencies import get_current_user
-from routers.auth import get_current_patient, get_current_doctor
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Request, Response
+from sqlalchemy import null, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from utils.dependencies import get_db, get_current_user, get_current_patient, get_current_doctor
 from models import appointment as appointment_model
 from schemas import appointment as appointment_schema
 from schemas.user import UserOut
-from datetime import datetime
+from datetime import datetime, timedelta
 from models.user import User
-from typing import List
+from typing import List, Optional
 from utils.notifications import create_notification
+from utils.fast_json import FastJSONResponse, rows_response, schema_columns
+from utils.pagination import DateRange, PageParams, paginate
+from utils.response_cache import user_directory_cache
+from utils.idempotency import IDEMPOTENCY_HEADER, get_stored_response, request_hash, store_response
+from services.scheduling import (
+    DEFAULT_SLOT_MINUTES, INACTIVE_STATUSES, OutsideWorkingHours, get_schedule, has_conflict, lock_doctor, slot_end,
+)
 
 
 
@@ -21,93 +27,159 @@ router = APIRouter(
     tags=["Appointments"]
 )
 
+APPOINTMENT_KEYS = (appointment_model.Appointment.scheduled_date, appointment_model.Appointment.id)
+
+# The model's `prescription` is a noload relationship, so the field is always null
+APPOINTMENT_COLUMNS = schema_columns(
+    appointment_model.Appointment,
+    appointment_schema.AppointmentOut,
+    prescription=null(),
+)
+
+BOOK_ENDPOINT = "POST /api/appointments/book"
+DOUBLE_BOOKING = "This doctor already has an appointment at that time"
+
+
+async def change_status(db: AsyncSession, appointment: appointment_model.Appointment, status: str):
+    """
+    Set and commit a new status. Reviving a cancelled appointment takes its
+    slot again, so it gets the same doctor lock and overlap check as a new
+    booking (409 when someone else has booked it meanwhile).
+    """
+    if appointment.status in INACTIVE_STATUSES and status not in INACTIVE_STATUSES:
+        await lock_doctor(db, appointment.doctor_id)
+        ends_at = appointment.ends_at or appointment.scheduled_date + timedelta(minutes=DEFAULT_SLOT_MINUTES)
+        if await has_conflict(db, appointment.doctor_id, appointment.scheduled_date, ends_at):
+            raise HTTPException(status_code=409, detail=DOUBLE_BOOKING)
+
+    appointment.status = status
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=DOUBLE_BOOKING)
+    await db.refresh(appointment)
+
+
+def filter_appointments(query, status: Optional[str], dates: DateRange):
+    if status:
+        query = query.where(appointment_model.Appointment.status == status)
+    return dates.apply(query, appointment_model.Appointment.scheduled_date)
+
 # ------------------ GET my appointments (Patient) ------------------
-@router.get("/my", response_model=list[appointment_schema.AppointmentOut])
-def get_my_appointments(
-    db: Session = Depends(get_db),
+@router.get("/my", response_model=list[appointment_schema.AppointmentOut], response_class=FastJSONResponse)
+async def get_my_appointments(
+    response: Response,
+    status: Optional[str] = Query(None),
+    dates: DateRange = Depends(),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
     patient: User = Depends(get_current_patient)
 ):
-    return db.query(appointment_model.Appointment).filter(
+    query = select(*APPOINTMENT_COLUMNS).where(
         appointment_model.Appointment.patient_id == patient.id
-    ).all()
+    )
+    rows = await paginate(db, filter_appointments(query, status, dates), APPOINTMENT_KEYS, page, response)
+    return rows_response(rows, response)
 
 
 # ------------------ GET doctor's appointments ------------------
-@router.get("/doctor", response_model=list[appointment_schema.AppointmentOut])
-def get_doctor_appointments(
-    db: Session = Depends(get_db),
+@router.get("/doctor", response_model=list[appointment_schema.AppointmentOut], response_class=FastJSONResponse)
+async def get_doctor_appointments(
+    response: Response,
+    status: Optional[str] = Query(None),
+    dates: DateRange = Depends(),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
     doctor: User = Depends(get_current_doctor)
 ):
-    return db.query(appointment_model.Appointment).filter(
+    query = select(*APPOINTMENT_COLUMNS).where(
         appointment_model.Appointment.doctor_id == doctor.id
-    ).all()
+    )
+    rows = await paginate(db, filter_appointments(query, status, dates), APPOINTMENT_KEYS, page, response)
+    return rows_response(rows, response)
 
 
 # ------------------ POST Book appointment ------------------
 
 @router.post("/book", response_model=appointment_schema.AppointmentOut)
-def book_appointment(
+async def book_appointment(
     appointment: appointment_schema.AppointmentCreate,
-    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER, max_length=255),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role != "patient":
         raise HTTPException(status_code=403, detail="Only patients can book appointments")
 
-    doctor = db.query(User).filter(
+    # A retried request gets the response of the original one
+    fingerprint = request_hash(appointment)
+    if idempotency_key:
+        stored = await get_stored_response(db, current_user.id, idempotency_key, BOOK_ENDPOINT, fingerprint)
+        if stored is not None:
+            return stored
+
+    doctor = await db.scalar(select(User).where(
         User.id == appointment.doctor_id,
         User.role == "doctor"
-    ).first()
+    ))
 
     if not doctor:
         raise HTTPException(status_code=404, detail="Doctor not found")
 
-    # Prevent double booking
-    existing = db.query(appointment_model.Appointment).filter(
-        and_(
-            appointment_model.Appointment.doctor_id == appointment.doctor_id,
-            appointment_model.Appointment.scheduled_date == appointment.scheduled_date,
-            appointment_model.Appointment.status != "cancelled"
-        )
-    ).first()
-
-    if existing:
-        raise HTTPException(
-            status_code=409,
-            detail="This doctor already has an appointment at that time"
-        )
+    try:
+        ends_at = slot_end(await get_schedule(db, appointment.doctor_id), appointment.scheduled_date)
+    except OutsideWorkingHours:
+        raise HTTPException(status_code=400, detail="Requested time is not an open slot in the doctor's working hours")
+
+    # Prevent double booking: any overlap with an active appointment. The
+    # doctor lock makes concurrent bookings of this doctor take turns, so the
+    # check sees every booking committed before ours; it is held until commit.
+    await lock_doctor(db, appointment.doctor_id)
+    if await has_conflict(db, appointment.doctor_id, appointment.scheduled_date, ends_at):
+        raise HTTPException(status_code=409, detail=DOUBLE_BOOKING)
 
     new_appointment = appointment_model.Appointment(
         patient_id=current_user.id,
         doctor_id=appointment.doctor_id,
         scheduled_date=appointment.scheduled_date,
+        ends_at=ends_at,
         reason=appointment.reason,
     )
     db.add(new_appointment)
-    db.commit()
-    db.refresh(new_appointment)
-
-# after appointment is created
     create_notification(
-    db=db,
-    user_id=appointment.doctor_id,
-    message=f"New appointment booked by {current_user.full_name}."
-)
-
-    return new_appointment
+        db=db,
+        user_id=appointment.doctor_id,
+        message=f"New appointment booked by {current_user.full_name}."
+    )
+    try:
+        await db.flush()
+        result = appointment_schema.AppointmentOut.model_validate(new_appointment, from_attributes=True)
+        if idempotency_key:
+            store_response(db, current_user.id, idempotency_key, BOOK_ENDPOINT, fingerprint, 200, result)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        # A concurrent retry with the same key won (the unique index on
+        # (doctor_id, scheduled_date) remains as a backstop for the slot)
+        if idempotency_key:
+            stored = await get_stored_response(db, current_user.id, idempotency_key, BOOK_ENDPOINT, fingerprint)
+            if stored is not None:
+                return stored
+        raise HTTPException(status_code=409, detail=DOUBLE_BOOKING)
+
+    return result
 
 
 #  ------------------ GET appointment details ------------------
 @router.patch("/{appointment_id}/status", response_model=appointment_schema.AppointmentOut)
-def update_appointment_status(
+async def update_appointment_status(
     appointment_id: int,
     payload: appointment_schema.AppointmentStatusUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    appointment = db.query(appointment_model.Appointment).filter(
-        appointment_model.Appointment.id == appointment_id
-    ).first()
+    appointment = await db.get(appointment_model.Appointment, appointment_id)
 
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
@@ -125,19 +197,17 @@ def update_appointment_status(
     else:
         raise HTTPException(status_code=403, detail="Invalid user role")
 
-    appointment.status = payload.status
-    db.commit()
-    db.refresh(appointment)
+    await change_status(db, appointment, payload.status)
     return appointment
 
 # ------------------ DELETE Appointment ------------------
 @router.delete("/{appointment_id}", status_code=204)
-def delete_appointment(
+async def delete_appointment(
     appointment_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    appointment = db.query(appointment_model.Appointment).filter_by(id=appointment_id).first()
+    appointment = await db.get(appointment_model.Appointment, appointment_id)
 
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
@@ -146,20 +216,20 @@ def delete_appointment(
     if current_user.role != "patient" or appointment.patient_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this appointment")
 
-    db.delete(appointment)
-    db.commit()
+    await db.delete(appointment)
+    await db.commit()
 
 
 from fastapi import Path
 
 # ------------------ CANCEL Appointment by Doctor ------------------
 @router.patch("/{appointment_id}/cancel", response_model=appointment_schema.AppointmentOut)
-def cancel_appointment_by_doctor(
+async def cancel_appointment_by_doctor(
     appointment_id: int = Path(..., title="The ID of the appointment to cancel"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     doctor: User = Depends(get_current_doctor)
 ):
-    appointment = db.query(appointment_model.Appointment).filter_by(id=appointment_id).first()
+    appointment = await db.get(appointment_model.Appointment, appointment_id)
 
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
@@ -168,27 +238,32 @@ def cancel_appointment_by_doctor(
         raise HTTPException(status_code=403, detail="Not authorized to cancel this appointment")
 
     appointment.status = "cancelled_by_doctor"
-    db.commit()
-    db.refresh(appointment)
+    await db.commit()
+    await db.refresh(appointment)
     return appointment
 
+async def load_users_by_role(db: AsyncSession, role: str) -> List[UserOut]:
+    users = (await db.scalars(select(User).where(User.role == role))).all()
+    return [UserOut.model_validate(user) for user in users]
+
+
 @router.get("/doctors", response_model=List[UserOut])
-def get_all_doctors(db: Session = Depends(get_db)):
-    return db.query(User).filter(User.role == "doctor").all()
+async def get_all_doctors(request: Request, db: AsyncSession = Depends(get_db)):
+    return await user_directory_cache.respond(request, ("users", "doctor"), lambda: load_users_by_role(db, "doctor"))
 
 
 @router.get("/patients", response_model=List[UserOut])
-def get_all_patients(db: Session = Depends(get_db)):
-    return db.query(User).filter(User.role == "patient").all()
+async def get_all_patients(request: Request, db: AsyncSession = Depends(get_db)):
+    return await user_directory_cache.respond(request, ("users", "patient"), lambda: load_users_by_role(db, "patient"))
 
 # PUT - Mark appointment as completed
 @router.put("/{appointment_id}/complete", response_model=appointment_schema.AppointmentOut)
-def complete_appointment(
+async def complete_appointment(
     appointment_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     doctor: User = Depends(get_current_doctor)
 ):
-    appointment = db.query(appointment_model.Appointment).filter_by(id=appointment_id).first()
+    appointment = await db.get(appointment_model.Appointment, appointment_id)
 
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
@@ -196,21 +271,19 @@ def complete_appointment(
     if appointment.doctor_id != doctor.id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    appointment.status = "completed"
-    db.commit()
-    db.refresh(appointment)
+    await change_status(db, appointment, "completed")
     return appointment
 
 
 # PUT - Add prescription
 @router.put("/{appointment_id}/prescribe", response_model=appointment_schema.AppointmentOut)
-def prescribe_medication(
+async def prescribe_medication(
     appointment_id: int,
     data: appointment_schema.PrescriptionUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     doctor: User = Depends(get_current_doctor)
 ):
-    appointment = db.query(appointment_model.Appointment).filter_by(id=appointment_id).first()
+    appointment = await db.get(appointment_model.Appointment, appointment_id)
 
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
@@ -222,7 +295,7 @@ def prescribe_medication(
         raise HTTPException(status_code=400, detail="Cannot prescribe before marking appointment as completed")
 
     appointment.prescription = data.prescription
-    db.commit()
-    db.refresh(appointment)
+    await db.commit()
+    await db.refresh(appointment)
     return appointment
 
@@ -1,27 +1,34 @@
 # backend/routers/auth.py
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
-from sqlalchemy.orm import Session
-from passlib.context import CryptContext
-from jose import JWTError, jwt
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from jose import JWTError
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 import os
 
-from database import SessionLocal
 from models.user import User  # ✅ FIX: Correct import
 from fastapi import Security
+from fastapi.security import HTTPAuthorizationCredentials
 from fastapi import HTTPException
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from models import user as user_model
 from fastapi.responses import JSONResponse
 from pydantic import EmailStr
 from fastapi import BackgroundTasks
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
 from datetime import timedelta
-from utils.email import send_password_reset_email
-from utils.dependencies import get_db  # or wherever your JWT function lives
+from utils.email import queue_password_reset_email
+from utils.dependencies import authenticate, get_db, get_current_user, security
+from utils.principal_cache import principal_cache
+from utils.hashing import get_password_hash_async, verify_password_async
+from utils.rate_limit import check_account_limit, check_login_failures, clear_login_failures, record_login_failure
+from utils.tokens import (
+    ACCESS_TOKEN, REFRESH_TOKEN_EXPIRE_DAYS, RESET_TOKEN, decode_token, encode_token, is_revoked, revoke_subject, revoke_token,
+)
+from services.refresh_sessions import (
+    InvalidRefreshToken, RefreshTokenReused, end_session, revoke_user_sessions, rotate_session, start_session,
+)
 
 router = APIRouter()
 
@@ -35,12 +42,9 @@ router = APIRouter()
 router = APIRouter()
 
 # 🔐 JWT Configuration
-SECRET_KEY = os.getenv("SECRET_KEY", "defaultsecret")
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
-
-# 🔑 Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+REFRESH_COOKIE = "refresh_token"
+REFRESH_COOKIE_SECURE = os.getenv("REFRESH_COOKIE_SECURE", "true").lower() == "true"
 
 # 📦 Schemas
 class UserCreate(BaseModel):
@@ -76,86 +80,32 @@ class ForgotPasswordRequest(BaseModel):
 class ResetPasswordRequest(BaseModel):
     token: str
     new_password: str
-    
-# 🧩 DB Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str | None = None
+    
 # 🔧 Utility Functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-
-def create_refresh_token(data: dict, expires_delta: timedelta = None):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(days=7))  # Default: 7 days
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-
-# 🛡️ oauth2_scheme
-security = HTTPBearer()
-
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    token = credentials.credentials
-    credentials_exception = HTTPException(
-        status_code=401,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
-        raise credentials_exception
-
-    return user
-
-   
-# get current patient
-def get_current_patient(current_user: User = Depends(get_current_user)):
-    if current_user.role != "patient":
-        raise HTTPException(status_code=403, detail="Patients only!")
-    return current_user
-
-def get_current_doctor(current_user: User = Depends(get_current_user)):
-    if current_user.role != "doctor":
-        raise HTTPException(status_code=403, detail="Doctors only!")
-    return current_user
-
-def get_current_admin(current_user: User = Depends(get_current_user)):
-    if current_user.role != "admin":
-        raise HTTPException(status_code=403, detail="Admins only!")
-    return current_user
+    return encode_token({**data, "typ": ACCESS_TOKEN}, expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
 
+def create_reset_token(email: str, expires_delta: timedelta):
+    return encode_token({"sub": email, "typ": RESET_TOKEN}, expires_delta)
 
+def set_refresh_cookie(response: Response, token: str):
+    response.set_cookie(
+        REFRESH_COOKIE, token,
+        max_age=REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600,
+        httponly=True, secure=REFRESH_COOKIE_SECURE, samesite="lax", path="/api/auth",
+    )
 
 # 🚀 Register Route
 @router.post("/register", response_model=UserOut)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    db_user = await db.scalar(select(User).where(User.email == user.email))
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_pw = get_password_hash(user.password)
+    hashed_pw = await get_password_hash_async(user.password, endpoint="register")
     new_user = User(
         email=user.email,
         hashed_password=hashed_pw,
@@ -163,22 +113,33 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         role="patient"  # Default role
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
 # 🔐 Login Route
 
 @router.post("/login")
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    db_user = db.query(user_model.User).filter(user_model.User.email == user.email).first()
+async def login(user: UserLogin, response: Response, db: AsyncSession = Depends(get_db)):
+    # Both checks run before bcrypt, so throttled attempts cost no hashing
+    await check_account_limit("login", user.email)
+    await check_login_failures(user.email)
+
+    db_user = await db.scalar(select(user_model.User).where(user_model.User.email == user.email))
     if not db_user:
+        await record_login_failure(user.email)
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    if not verify_password(user.password, db_user.hashed_password):
+    if not await verify_password_async(user.password, db_user.hashed_password, endpoint="login"):
+        await record_login_failure(user.email)
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    await clear_login_failures(user.email)
+    if db_user.is_active is False:
+        raise HTTPException(status_code=403, detail="Account is deactivated")
     
     access_token = create_access_token(data={"sub": db_user.email})
-    refresh_token = create_refresh_token(data={"sub": db_user.email})
+    refresh_token = start_session(db, db_user.id)
+    await db.commit()
+    set_refresh_cookie(response, refresh_token)
 
     # Build user info dictionary
     user_info = {
@@ -197,33 +158,65 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
 
 # 
 @router.get("/me", response_model=UserOut)
-def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
 
 @router.post("/refresh-token")
-def refresh_token(request: Request):
-    refresh_token = request.cookies.get("refresh_token")
+async def refresh_token(
+    request: Request,
+    response: Response,
+    data: RefreshTokenRequest | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    # No password check here: one indexed lookup by token hash, then rotation
+    refresh_token = (data.refresh_token if data else None) or request.cookies.get(REFRESH_COOKIE)
     if not refresh_token:
         raise HTTPException(status_code=401, detail="Refresh token missing")
-    
+
     try:
-        payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
-        email = payload.get("sub")
-    except JWTError:
+        user, new_refresh_token = await rotate_session(db, refresh_token)
+    except RefreshTokenReused:
+        raise HTTPException(status_code=403, detail="Refresh token reuse detected, please log in again")
+    except InvalidRefreshToken:
         raise HTTPException(status_code=403, detail="Invalid refresh token")
 
-    new_access_token = create_access_token(data={"sub": email})
-    return {"access_token": new_access_token}
+    set_refresh_cookie(response, new_refresh_token)
+    return {
+        "access_token": create_access_token(data={"sub": user.email}),
+        "refresh_token": new_refresh_token,
+        "token_type": "bearer",
+    }
+
+
+@router.post("/logout")
+async def logout(
+    request: Request,
+    response: Response,
+    data: RefreshTokenRequest | None = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db),
+):
+    claims = {}
+    await authenticate(credentials.credentials, db, claims)
+    revoke_token(db, claims)
+
+    refresh_token = (data.refresh_token if data else None) or request.cookies.get(REFRESH_COOKIE)
+    if refresh_token:
+        await end_session(db, refresh_token)
+    await db.commit()
+    response.delete_cookie(REFRESH_COOKIE, path="/api/auth")
+    return {"message": "Logged out"}
 
 
 
 @router.post("/forgot-password")
-def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == request.email).first()
+async def forgot_password(request: ForgotPasswordRequest, db: AsyncSession = Depends(get_db)):
+    await check_account_limit("forgot-password", request.email)
+    user = await db.scalar(select(User).where(User.email == request.email))
     if not user:
         raise HTTPException(status_code=404, detail="Email not found")
 
-    reset_token = create_access_token({"sub": user.email}, expires_delta=timedelta(minutes=30))
+    reset_token = create_reset_token(user.email, timedelta(minutes=30))
     
     # You could send this in email instead
     return {"reset_token": reset_token, "message": "Reset token generated"}
@@ -233,53 +226,42 @@ class ResetPasswordRequest(BaseModel):
     new_password: str
 
 @router.post("/reset-password")
-def reset_password(data: ResetPasswordRequest, db: Session = Depends(get_db)):
+async def reset_password(data: ResetPasswordRequest, db: AsyncSession = Depends(get_db)):
     try:
-        payload = jwt.decode(data.token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(data.token)
         email = payload.get("sub")
-        if email is None:
+        if email is None or payload.get("typ") != RESET_TOKEN:
             raise HTTPException(status_code=400, detail="Invalid token")
     except JWTError:
         raise HTTPException(status_code=400, detail="Invalid or expired token")
+    if await is_revoked(db, payload):
+        raise HTTPException(status_code=400, detail="Invalid or expired token")
 
-    user = db.query(User).filter(User.email == email).first()
+    user = await db.scalar(select(User).where(User.email == email))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    user.hashed_password = get_password_hash(data.new_password)
-    db.commit()
+    user.hashed_password = await get_password_hash_async(data.new_password, endpoint="reset-password")
+    # Signs out every session and makes the reset token single-use
+    revoke_subject(db, email)
+    await revoke_user_sessions(db, user.id)
+    await db.commit()
+    principal_cache.invalidate(email)
     return {"message": "Password has been reset successfully"}
 
 
 @router.post("/request-password-reset")
-def request_password_reset(email: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == email).first()
+async def request_password_reset(email: str, db: AsyncSession = Depends(get_db)):
+    await check_account_limit("request-password-reset", email)
+    user = await db.scalar(select(User).where(User.email == email))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    token_data = {"sub": user.email}
-    reset_token = create_access_token(data=token_data, expires_delta=timedelta(minutes=15))
+    reset_token = create_reset_token(user.email, timedelta(minutes=15))
 
-    # Send email in background using Resend
-    background_tasks.add_task(send_password_reset_email, user.email, reset_token)
+    # Delivered by email_worker.py, with retries
+    queue_password_reset_email(db, user.email, reset_token)
+    await db.commit()
 
     return {"message": "Password reset email sent"}
 
-
-
-@router.post("/reset-password")
-def reset_password(data: ResetPasswordRequest, db: Session = Depends(get_db)):
-    try:
-        payload = jwt.decode(data.token, SECRET_KEY, algorithms=[ALGORITHM])
-        email = payload.get("sub")
-    except JWTError:
-        raise HTTPException(status_code=403, detail="Invalid or expired token")
-
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    user.hashed_password = get_password_hash(data.new_password)
-    db.commit()
-    
-    return {"message": "Password reset successful"}
@@ -1,15 +1,24 @@
 # routers/doctors.py
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from routers.auth import UserOut, get_current_admin, get_password_hash
-from database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from routers.auth import UserOut
+from utils.dependencies import get_db, get_current_admin, get_current_user
 from models.user import User
+from models.doctor_schedule import DoctorSchedule
+from schemas.doctor_schedule import AvailabilitySlot, ScheduleUpdate, WorkingHours
+from services.scheduling import get_availability, get_schedule, naive_utc
+from datetime import datetime, timedelta
 from typing import List, Optional
 from pydantic import BaseModel
+from utils.hashing import get_password_hash_async
+from utils.response_cache import user_directory_cache
 
 router = APIRouter()
 
+MAX_AVAILABILITY_DAYS = 31
+
 class DoctorOut(BaseModel):
     id: int
     full_name: Optional[str]
@@ -26,19 +35,23 @@ class DoctorCreate(BaseModel):
     specialization: str
 
 @router.get("/doctors", response_model=List[DoctorOut])
-def get_doctors(
+async def get_doctors(
+    request: Request,
     specialization: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    query = db.query(User).filter(User.role == "doctor")
-    if specialization:
-        query = query.filter(User.specialization == specialization)
-    return query.all()
+    async def load():
+        query = select(User).where(User.role == "doctor")
+        if specialization:
+            query = query.where(User.specialization == specialization)
+        return [DoctorOut.model_validate(user, from_attributes=True) for user in (await db.scalars(query)).all()]
+
+    return await user_directory_cache.respond(request, ("doctors", specialization), load)
 
 
 @router.post("/admin/create-doctor", response_model=UserOut)
-def create_doctor(doctor: DoctorCreate, db: Session = Depends(get_db), current_admin: User = Depends(get_current_admin)):
-    hashed_pw = get_password_hash(doctor.password)
+async def create_doctor(doctor: DoctorCreate, db: AsyncSession = Depends(get_db), current_admin: User = Depends(get_current_admin)):
+    hashed_pw = await get_password_hash_async(doctor.password, endpoint="create-doctor")
     new_doctor = User(
         email=doctor.email,
         hashed_password=hashed_pw,
@@ -47,6 +60,47 @@ def create_doctor(doctor: DoctorCreate, db: Session = Depends(get_db), current_a
         specialization=doctor.specialization
     )
     db.add(new_doctor)
-    db.commit()
-    db.refresh(new_doctor)
+    await db.commit()
+    await db.refresh(new_doctor)
     return new_doctor
+
+
+@router.get("/doctors/{doctor_id}/availability", response_model=List[AvailabilitySlot])
+async def get_doctor_availability(
+    doctor_id: int,
+    date_from: datetime = Query(..., alias="from"),
+    date_to: datetime = Query(..., alias="to"),
+    db: AsyncSession = Depends(get_db)
+):
+    date_from, date_to = naive_utc(date_from), naive_utc(date_to)
+    if date_to <= date_from:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+    if date_to - date_from > timedelta(days=MAX_AVAILABILITY_DAYS):
+        raise HTTPException(status_code=400, detail=f"Range cannot exceed {MAX_AVAILABILITY_DAYS} days")
+    return await get_availability(db, doctor_id, date_from, date_to)
+
+
+@router.get("/doctors/{doctor_id}/schedule", response_model=List[WorkingHours])
+async def get_doctor_schedule(doctor_id: int, db: AsyncSession = Depends(get_db)):
+    return await get_schedule(db, doctor_id)
+
+
+@router.put("/doctors/{doctor_id}/schedule", response_model=List[WorkingHours])
+async def set_doctor_schedule(
+    doctor_id: int,
+    data: ScheduleUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "admin" and current_user.id != doctor_id:
+        raise HTTPException(status_code=403, detail="Not authorized to change this schedule")
+
+    doctor = await db.scalar(select(User).where(User.id == doctor_id, User.role == "doctor"))
+    if not doctor:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+
+    await db.execute(delete(DoctorSchedule).where(DoctorSchedule.doctor_id == doctor_id))
+    schedule = [DoctorSchedule(doctor_id=doctor_id, **hours.model_dump()) for hours in data.working_hours]
+    db.add_all(schedule)
+    await db.commit()
+    return schedule
@@ -0,0 +1,105 @@
+# routers/exports.py
+#
+# Streaming admin exports. Rows are read through a server-side cursor in
+# EXPORT_CHUNK_SIZE batches and written out as they arrive, so memory use
+# does not depend on the size of the table. Exports with a timestamp are
+# in timestamp order, so ?from=&to= reads a range of that column's index.
+import csv
+import io
+import os
+from datetime import datetime
+from typing import Literal
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal
+from models.appointment import Appointment
+from models.drug_order import DrugOrder
+from models.prescription_model import Prescription, PrescriptionItem
+from models.user import User
+from schemas.drug_order import DrugOrderOut
+from utils.dependencies import get_db, get_current_admin
+from utils.fast_json import schema_columns
+from utils.pagination import DateRange
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 1000))
+
+router = APIRouter(prefix="/api/admin/exports", tags=["Admin"])
+
+# name -> (query, timestamp column used by ?from=&to=)
+EXPORTS = {
+    "orders": (
+        select(*schema_columns(DrugOrder, DrugOrderOut)).order_by(DrugOrder.created_at, DrugOrder.id),
+        DrugOrder.created_at,
+    ),
+    "appointments": (
+        select(
+            Appointment.id, Appointment.doctor_id, Appointment.patient_id, Appointment.scheduled_date,
+            Appointment.ends_at, Appointment.reason, Appointment.status, Appointment.created_at,
+        ).order_by(Appointment.scheduled_date, Appointment.id),
+        Appointment.scheduled_date,
+    ),
+    # one row per prescribed drug
+    "prescriptions": (
+        select(
+            Prescription.id.label("prescription_id"), Prescription.appointment_id, Prescription.doctor_id,
+            Prescription.issued_at, PrescriptionItem.position, PrescriptionItem.name,
+            PrescriptionItem.dosage, PrescriptionItem.instructions,
+        ).join(PrescriptionItem).order_by(Prescription.issued_at, Prescription.id, PrescriptionItem.position),
+        Prescription.issued_at,
+    ),
+    "users": (
+        select(User.id, User.email, User.full_name, User.role, User.specialization).order_by(User.id),
+        None,
+    ),
+}
+
+
+def _csv_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+async def export_rows(query, fmt: str):
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+        columns = list(result.keys())
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            async for chunk in result.partitions():
+                writer.writerows([_csv_value(value) for value in row] for row in chunk)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        else:
+            async for chunk in result.partitions():
+                yield b"".join(orjson.dumps(dict(zip(columns, row))) + b"\n" for row in chunk)
+
+
+@router.get("/{name}")
+async def export(
+    name: Literal["orders", "appointments", "prescriptions", "users"],
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    dates: DateRange = Depends(),
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(get_current_admin)
+):
+    query, timestamp = EXPORTS[name]
+    if timestamp is not None:
+        query = dates.apply(query, timestamp)
+    elif dates.date_from or dates.date_to:
+        raise HTTPException(status_code=400, detail=f"The {name} export has no date filter")
+
+    # The export opens its own session; release the one used for auth
+    await db.close()
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_rows(query, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{name}.{format}"'},
+    )
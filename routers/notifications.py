@@ -1,31 +1,142 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import json
+import os
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal
 from models.notification import Notification
-from schemas.notification import NotificationOut
-from database import get_db
+from schemas.notification import MarkReadRequest, NotificationOut, UnreadCount
 from models.user import User
-from utils.dependencies import get_current_user
-from typing import List
+from utils.dependencies import get_db, get_current_user, get_stream_user
+from typing import List, Optional
+from utils.notifications import get_unread_count, mark_read, notification_channel, serialize_notification
+from utils.fast_json import FastJSONResponse, rows_response, schema_columns
+from utils.pagination import DateRange, PageParams, paginate
+from utils.pubsub import SubscriberLagging, hub
 
 router = APIRouter(prefix="/api/notifications", tags=["Notifications"])
 
-@router.get("/", response_model=List[NotificationOut])
-def get_notifications(
-    db: Session = Depends(get_db),
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", 15))
+SSE_REPLAY_BATCH_SIZE = 500
+
+
+def sse_event(event_id: int, data: str) -> str:
+    return f"id: {event_id}\nevent: notification\ndata: {data}\n\n"
+
+
+async def replay_since(user_id: int, last_id: int):
+    """Notifications after `last_id`, oldest first, read in batches."""
+    while True:
+        async with AsyncSessionLocal() as db:
+            batch = (await db.scalars(
+                select(Notification)
+                .where(Notification.user_id == user_id, Notification.id > last_id)
+                .order_by(Notification.id)
+                .limit(SSE_REPLAY_BATCH_SIZE)
+            )).all()
+        for notification in batch:
+            yield notification
+        if len(batch) < SSE_REPLAY_BATCH_SIZE:
+            return
+        last_id = batch[-1].id
+
+
+async def notification_events(user_id: int, last_id: Optional[int]):
+    # Subscribe before replaying so nothing committed in between is missed;
+    # live events already sent by the replay are skipped by id.
+    async with hub.subscribe(notification_channel(user_id)) as subscription:
+        yield f"retry: {int(SSE_KEEPALIVE_SECONDS * 1000)}\n\n"
+        if last_id is not None:
+            async for notification in replay_since(user_id, last_id):
+                last_id = notification.id
+                yield sse_event(notification.id, serialize_notification(notification))
+
+        while True:
+            try:
+                message = await subscription.get(timeout=SSE_KEEPALIVE_SECONDS)
+            except SubscriberLagging:
+                # The client reconnects with Last-Event-ID and replays the gap
+                return
+            if message is None:
+                yield ": keepalive\n\n"
+                continue
+            event_id = json.loads(message)["id"]
+            if last_id is not None and event_id <= last_id:
+                continue
+            last_id = event_id
+            yield sse_event(event_id, message)
+
+NOTIFICATION_COLUMNS = schema_columns(Notification, NotificationOut)
+
+
+@router.get("/", response_model=List[NotificationOut], response_class=FastJSONResponse)
+async def get_notifications(
+    response: Response,
+    dates: DateRange = Depends(),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    query = dates.apply(select(*NOTIFICATION_COLUMNS).where(Notification.user_id == current_user.id), Notification.created_at)
+    rows = await paginate(db, query, (Notification.created_at, Notification.id), page, response, descending=True)
+    return rows_response(rows, response)
+
+
+@router.get("/unread-count", response_model=UnreadCount)
+async def unread_count(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return db.query(Notification).filter(Notification.user_id == current_user.id).order_by(Notification.created_at.desc()).all()
+    return {"unread_count": await get_unread_count(db, current_user.id)}
+
+
+@router.post("/mark-read", response_model=UnreadCount)
+async def mark_many_as_read(
+    payload: MarkReadRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    if payload.ids is not None:
+        condition = Notification.id.in_(payload.ids)
+    else:
+        condition = Notification.id <= payload.up_to_id
+    await mark_read(db, current_user.id, condition)
+    await db.commit()
+    return {"unread_count": await get_unread_count(db, current_user.id)}
 
 
 @router.patch("/{notification_id}/mark-read")
-def mark_as_read(
+async def mark_as_read(
     notification_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    notif = db.query(Notification).filter(Notification.id == notification_id, Notification.user_id == current_user.id).first()
+    notif = await db.scalar(select(Notification.id).where(Notification.id == notification_id, Notification.user_id == current_user.id))
     if not notif:
         raise HTTPException(status_code=404, detail="Notification not found")
-    notif.is_read = 1
-    db.commit()
+    await mark_read(db, current_user.id, Notification.id == notification_id)
+    await db.commit()
     return {"message": "Marked as read"}
+
+
+@router.get("/stream")
+async def stream_notifications(
+    last_event_id: Optional[int] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_stream_user)
+):
+    """
+    Server-sent events with the user's new notifications.
+
+    Authenticate with the usual bearer header, or `?token=` from browsers'
+    EventSource. Reconnecting with Last-Event-ID first replays everything
+    created after that id.
+    """
+    # The stream is long-lived; don't keep the auth query's connection checked out
+    await db.close()
+    return StreamingResponse(
+        notification_events(current_user.id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
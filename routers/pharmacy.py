@@ -1,50 +1,76 @@
 # routers/pharmacy.py
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.drug_order import DrugOrder
 from schemas.drug_order import DrugOrderCreate, DrugOrderOut, DrugOrderRequest, UpdateOrderStatus
-from utils.dependencies import get_current_user
+from utils.dependencies import get_db, get_current_user
 from models.user import User
-from models.prescription_model import Prescription 
+from models.prescription_model import Prescription, PrescriptionItem
 from datetime import datetime
-import json
+from typing import Literal, Optional
 from models.pharmacy_inventory import PharmacyInventory
-from schemas.pharmacy_inventory import PharmacyInventoryCreate, PharmacyInventoryUpdate, PharmacyInventoryOut
+from schemas.pharmacy_inventory import (
+    InventoryImportReport, InventorySearchResult, PharmacyInventoryCreate, PharmacyInventoryUpdate,
+    PharmacyInventoryOut, StockLevel, StockMovementOut,
+)
+from services.inventory_index import inventory_index, refresh_inventory_index
+from services.inventory_import import ImportAborted, import_inventory, iter_lines
+from services.stock_reservation import StockShortfall, reserve_stock, release_stock
+from services.stock_ledger import ADJUSTMENT, DISPENSE, RECEIPT, REMOVAL, RETURN, record_movements, stock_as_of
+from models.stock_movement import StockMovement
+from utils.fast_json import FastJSONResponse, rows_response, schema_columns
+from utils.pagination import DateRange, PageParams, paginate
 
 router = APIRouter(prefix="/api/pharmacy", tags=["Pharmacy"])
 
-@router.post("/order", response_model=DrugOrderOut)
-def create_order(order: DrugOrderRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    prescription = db.query(Prescription).filter_by(id=order.prescription_id).first()
+ORDER_KEYS = (DrugOrder.created_at, DrugOrder.id)
+ORDER_COLUMNS = schema_columns(DrugOrder, DrugOrderOut)
+MOVEMENT_COLUMNS = schema_columns(StockMovement, StockMovementOut)
+
+
+def filter_orders(query, order_status: Optional[str], payment_status: Optional[str], dates: DateRange):
+    if order_status:
+        query = query.where(DrugOrder.order_status == order_status)
+    if payment_status:
+        query = query.where(DrugOrder.payment_status == payment_status)
+    return dates.apply(query, DrugOrder.created_at)
+
+
+async def prescribed_drug_names(db: AsyncSession, prescription_id: int) -> list[str]:
+    return list((await db.scalars(
+        select(PrescriptionItem.name).where(PrescriptionItem.prescription_id == prescription_id)
+    )).all())
+
+@router.post("/order")
+async def create_order(order: DrugOrderRequest, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    prescription = await db.get(Prescription, order.prescription_id)
     if not prescription:
         raise HTTPException(status_code=404, detail="Prescription not found")
 
-    existing_order = db.query(DrugOrder).filter_by(prescription_id=order.prescription_id).first()
+    existing_order = await db.scalar(select(DrugOrder).filter_by(prescription_id=order.prescription_id))
     if existing_order:
         raise HTTPException(status_code=400, detail="Order already placed for this prescription")
 
     # Load prescribed drugs
+    drug_names = await prescribed_drug_names(db, order.prescription_id)
+
+    # Reserve every drug in one round trip; stock is only consumed if all are available
     try:
-        drug_list = json.loads(prescription.drugs)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid drug format in prescription")
-
-    unavailable = []
-    for drug in drug_list:
-        drug_name = drug.get("name")
-        inventory = db.query(PharmacyInventory).filter_by(name=drug_name).first()
-        if not inventory or inventory.quantity < 1:
-            unavailable.append(drug_name)
-
-    if unavailable:
+        reserved = await reserve_stock(db, drug_names)
+    except StockShortfall as exc:
+        await db.rollback()
         raise HTTPException(
             status_code=400,
-            detail=f"The following drugs are out of stock: {', '.join(unavailable)}"
+            detail={
+                "message": f"The following drugs are out of stock: {', '.join(s['name'] for s in exc.shortfalls)}",
+                "shortfalls": exc.shortfalls,
+            }
         )
 
-    total_amount = len(drug_list) * 1500
+    total_amount = len(drug_names) * 1500
 
     new_order = DrugOrder(
         prescription_id=order.prescription_id,
@@ -55,8 +81,16 @@ def create_order(order: DrugOrderRequest, db: Session = Depends(get_db), current
         order_status="pending"
     )
     db.add(new_order)
-    db.commit()
-    db.refresh(new_order)
+    try:
+        await db.flush()
+        await record_movements(db, {inventory_id: -units for inventory_id, units in reserved.items()},
+                               DISPENSE, order_id=new_order.id, user_id=current_user.id)
+        await db.commit()
+    except IntegrityError:
+        # A concurrent order for the same prescription won; the rollback returns our stock
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Order already placed for this prescription")
+    await db.refresh(new_order)
 
     return {
         "message": "Order placed successfully",
@@ -67,13 +101,13 @@ def create_order(order: DrugOrderRequest, db: Session = Depends(get_db), current
 
 # Update Payment & Delivery Status
 @router.patch("/order/{order_id}/update-status")
-def update_order_status(
+async def update_order_status(
     order_id: int,
     update_data: UpdateOrderStatus,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    order = db.query(DrugOrder).filter(DrugOrder.id == order_id).first()
+    order = await db.get(DrugOrder, order_id)
 
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -81,15 +115,30 @@ def update_order_status(
     if current_user.id != order.patient_id and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to update this order")
 
+    # Patients may only cancel their own pending order; everything else is an admin action
+    if current_user.role != "admin" and (
+        update_data.payment_status is not None
+        or update_data.order_status not in (None, "cancelled")
+        or (update_data.order_status == "cancelled" and order.order_status not in ("pending", "cancelled"))
+    ):
+        raise HTTPException(status_code=403, detail="Patients can only cancel a pending order")
+
+    # Cancelling returned the stock, so a cancelled order stays cancelled
+    if order.order_status == "cancelled" and update_data.order_status not in (None, "cancelled"):
+        raise HTTPException(status_code=400, detail="Cancelled orders cannot be reopened")
 
     if update_data.payment_status is not None:
         order.payment_status = update_data.payment_status
 
     if update_data.order_status is not None:
+        # Put reserved stock back when an order is cancelled
+        if update_data.order_status == "cancelled" and order.order_status != "cancelled":
+            returned = await release_stock(db, await prescribed_drug_names(db, order.prescription_id))
+            await record_movements(db, returned, RETURN, order_id=order.id, user_id=current_user.id)
         order.order_status = update_data.order_status
 
-    db.commit()
-    db.refresh(order)
+    await db.commit()
+    await db.refresh(order)
 
     return {
         "message": "Order status updated",
@@ -98,34 +147,45 @@ def update_order_status(
     }
 
 # View your own order history
-@router.get("/orders/my", response_model=list[DrugOrderOut])
-def get_my_orders(
-    db: Session = Depends(get_db),
+@router.get("/orders/my", response_model=list[DrugOrderOut], response_class=FastJSONResponse)
+async def get_my_orders(
+    response: Response,
+    order_status: Optional[str] = Query(None),
+    payment_status: Optional[str] = Query(None),
+    dates: DateRange = Depends(),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    print(f"Fetching orders for user: {current_user.id}")
-    orders = db.query(DrugOrder).filter(DrugOrder.patient_id == current_user.id).all()
-    return orders
+    query = filter_orders(select(*ORDER_COLUMNS).where(DrugOrder.patient_id == current_user.id), order_status, payment_status, dates)
+    rows = await paginate(db, query, ORDER_KEYS, page, response, descending=True)
+    return rows_response(rows, response)
 
 
 
 # Admin: View all orders
-@router.get("/orders", response_model=list[DrugOrderOut])
-def get_all_orders(
-    db: Session = Depends(get_db),
+@router.get("/orders", response_model=list[DrugOrderOut], response_class=FastJSONResponse)
+async def get_all_orders(
+    response: Response,
+    order_status: Optional[str] = Query(None),
+    payment_status: Optional[str] = Query(None),
+    dates: DateRange = Depends(),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Only admin can view all orders")
 
-    orders = db.query(DrugOrder).all()
-    return orders
+    query = filter_orders(select(*ORDER_COLUMNS), order_status, payment_status, dates)
+    rows = await paginate(db, query, ORDER_KEYS, page, response, descending=True)
+    return rows_response(rows, response)
 
 
 @router.post("/inventory", response_model=PharmacyInventoryOut)
-def add_drug_to_inventory(
+async def add_drug_to_inventory(
     data: PharmacyInventoryCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role != "admin":
@@ -133,48 +193,159 @@ def add_drug_to_inventory(
 
     drug = PharmacyInventory(name=data.name, quantity=data.quantity)
     db.add(drug)
-    db.commit()
-    db.refresh(drug)
+    try:
+        await db.flush()
+        await record_movements(db, {drug.id: data.quantity}, RECEIPT, user_id=current_user.id)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Drug already exists in inventory")
+    inventory_index.upsert(drug.id, drug.name)
     return drug
 
 
 @router.patch("/inventory/{drug_id}", response_model=PharmacyInventoryOut)
-def update_inventory_item(
+async def update_inventory_item(
     drug_id: int,
     update_data: PharmacyInventoryUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Only admins can update inventory")
 
-    drug = db.query(PharmacyInventory).filter(PharmacyInventory.id == drug_id).first()
+    if update_data.quantity is not None and update_data.delta is not None:
+        raise HTTPException(status_code=400, detail="Provide either quantity or delta, not both")
+
+    # Locked so the recorded movement matches the change actually applied
+    drug = await db.get(PharmacyInventory, drug_id, with_for_update=True)
     if not drug:
         raise HTTPException(status_code=404, detail="Drug not found")
 
     if update_data.name is not None:
         drug.name = update_data.name
+
+    change, kind = 0, ADJUSTMENT
     if update_data.quantity is not None:
-        drug.quantity = update_data.quantity
+        change = update_data.quantity - (drug.quantity or 0)
+    elif update_data.delta is not None:
+        change = update_data.delta
+        kind = RECEIPT if change > 0 else ADJUSTMENT
+    if (drug.quantity or 0) + change < 0:
+        raise HTTPException(status_code=400, detail="Stock cannot go below zero")
+    drug.quantity = (drug.quantity or 0) + change
 
-    db.commit()
-    db.refresh(drug)
+    try:
+        await db.flush()
+        await record_movements(db, {drug.id: change}, kind, user_id=current_user.id)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Drug already exists in inventory")
+    await db.refresh(drug)
+    inventory_index.upsert(drug.id, drug.name)
     return drug
 
 
 @router.delete("/inventory/{drug_id}")
-def delete_inventory_item(
+async def delete_inventory_item(
     drug_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Only admins can delete inventory")
 
-    drug = db.query(PharmacyInventory).filter(PharmacyInventory.id == drug_id).first()
+    drug = await db.get(PharmacyInventory, drug_id, with_for_update=True)
     if not drug:
         raise HTTPException(status_code=404, detail="Drug not found")
 
-    db.delete(drug)
-    db.commit()
+    await record_movements(db, {drug.id: -(drug.quantity or 0)}, REMOVAL, user_id=current_user.id)
+    await db.delete(drug)
+    await db.commit()
+    inventory_index.remove(drug_id)
     return {"message": "Drug deleted from inventory"}
+
+
+@router.get("/inventory/search", response_model=list[InventorySearchResult])
+async def search_inventory(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Autocomplete drug names by prefix of the name or any word in it."""
+    await refresh_inventory_index(db)
+    return inventory_index.search(q, limit)
+
+
+@router.post("/inventory/bulk", response_model=InventoryImportReport)
+async def bulk_import_inventory(
+    request: Request,
+    format: Literal["csv", "ndjson"] = Query("csv"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Upsert many inventory items from the raw request body.
+
+    CSV needs a header row with `name` and either `quantity` (set the stock
+    level) or `delta` (add to it; negative to remove). NDJSON takes one
+    object per line with the same keys. Invalid rows are listed in
+    `errors` and skipped. Rows are committed in chunks: if the database
+    fails mid-import, the 500 response says through which line rows were
+    applied, so the rest of the file can be resubmitted.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can import inventory")
+
+    try:
+        return await import_inventory(db, iter_lines(request.stream()), format, user_id=current_user.id)
+    except ImportAborted as exc:
+        report = exc.report
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "message": f"Import stopped by a database error; rows through line {report.committed_through_line} were applied",
+                "report": InventoryImportReport.model_validate(report).model_dump(),
+            }
+        )
+
+
+@router.get("/inventory/{drug_id}/stock", response_model=StockLevel)
+async def get_stock_level(
+    drug_id: int,
+    at: Optional[datetime] = Query(None, description="Point in time (UTC); defaults to now"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Stock of an item now, or as of any past moment from the movement ledger."""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view stock history")
+
+    if at is None:
+        drug = await db.get(PharmacyInventory, drug_id)
+        if not drug:
+            raise HTTPException(status_code=404, detail="Drug not found")
+        return {"inventory_id": drug_id, "at": datetime.utcnow(), "quantity": drug.quantity or 0}
+    return {"inventory_id": drug_id, "at": at, "quantity": await stock_as_of(db, drug_id, at)}
+
+
+@router.get("/inventory/{drug_id}/movements", response_model=list[StockMovementOut], response_class=FastJSONResponse)
+async def list_stock_movements(
+    drug_id: int,
+    response: Response,
+    dates: DateRange = Depends(),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view stock history")
+
+    query = dates.apply(
+        select(*MOVEMENT_COLUMNS).where(StockMovement.inventory_id == drug_id),
+        StockMovement.created_at,
+    )
+    rows = await paginate(db, query, (StockMovement.id,), page, response, descending=True)
+    return rows_response(rows, response)
@@ -1,22 +1,28 @@
 from typing import List
 from fastapi import APIRouter, Depends
-from routers.auth import get_current_doctor
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from schemas.schemas import PrescriptionCreate, PrescriptionOut
 from models import appointment, prescription_model
-from utils.dependencies import get_current_user, RoleChecker
-import json
-from models.prescription_model import Prescription
+from utils.dependencies import get_db, get_current_user, RoleChecker
+from models.prescription_model import Prescription, PrescriptionItem
 from models.appointment import Appointment
 from schemas.schemas import PrescriptionCreate, PrescriptionOut
-from utils.dependencies import get_current_user
 from models.user import User
 from utils.notifications import create_notification
+from utils.pagination import DateRange, PageParams, paginate
 
 router = APIRouter(prefix="/api/prescriptions", tags=["Prescriptions"])
 
+
+PRESCRIPTION_KEYS = (Prescription.issued_at, Prescription.id)
+
+
+def build_items(drugs) -> List[PrescriptionItem]:
+    return [PrescriptionItem(position=position, **drug.model_dump()) for position, drug in enumerate(drugs)]
+
 # @router.post("/")
 # def prescribe_medicine(doctor=Depends(get_current_doctor)):
 #     return {"message": f"Doctor {doctor.full_name} can prescribe meds."}
@@ -24,136 +30,106 @@ router = APIRouter(prefix="/api/prescriptions", tags=["Prescriptions"])
 
 
 @router.post("/", response_model=PrescriptionOut)
-def create_prescription(prescription_data: PrescriptionCreate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+async def create_prescription(prescription_data: PrescriptionCreate, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
     # Check if a prescription already exists for this appointment
-    existing = db.query(Prescription).filter_by(appointment_id=prescription_data.appointment_id).first()
+    existing = await db.scalar(select(Prescription).filter_by(appointment_id=prescription_data.appointment_id))
     if existing:
         raise HTTPException(status_code=400, detail="Prescription already exists for this appointment")
 
+    appointment_record = await db.get(Appointment, prescription_data.appointment_id)
+    if not appointment_record:
+        raise HTTPException(status_code=404, detail="Appointment not found")
+
     new_prescription = Prescription(
         appointment_id=prescription_data.appointment_id,
         doctor_id=user.id,
-        drugs=json.dumps([drug.dict() for drug in prescription_data.drugs])
+        items=build_items(prescription_data.drugs)
     )
     db.add(new_prescription)
-    db.commit()
-    db.refresh(new_prescription)
-
-
-# after prescription is created
     create_notification(
-    db=db,
-    user_id=prescription_data.patient_id,
-    message=f"You have a new prescription from Dr. {user.full_name}."
-)
-
-
-    return PrescriptionOut(
-        id=new_prescription.id,
-        appointment_id=new_prescription.appointment_id,
-        doctor_id=new_prescription.doctor_id,
-        drugs=json.loads(new_prescription.drugs),
-        issued_at=new_prescription.issued_at
+        db=db,
+        user_id=appointment_record.patient_id,
+        message=f"You have a new prescription from Dr. {user.full_name}."
     )
+    await db.commit()
+
+    return new_prescription
 
 
 @router.post("/issue", response_model=PrescriptionOut)
-def issue_prescription(payload: PrescriptionCreate, 
-                       db: Session = Depends(get_db),
+async def issue_prescription(payload: PrescriptionCreate, 
+                       db: AsyncSession = Depends(get_db),
                        current_user=Depends(RoleChecker("doctor"))):
-    appointment = db.query(appointment.Appointment).filter_by(id=payload.appointment_id).first()
+    appointment_record = await db.get(Appointment, payload.appointment_id)
 
-    if not appointment:
+    if not appointment_record:
         raise HTTPException(status_code=404, detail="Appointment not found")
 
-    if appointment.doctor_id != current_user.id:
+    if appointment_record.doctor_id != current_user.id:
         raise HTTPException(status_code=403, detail="You are not authorized to prescribe for this appointment")
 
-    if appointment.status != "completed":
+    if appointment_record.status != "completed":
         raise HTTPException(status_code=400, detail="Prescription can only be issued after appointment is completed")
 
     prescription = prescription_model.Prescription(
         appointment_id=payload.appointment_id,
         doctor_id=current_user.id,
-        drugs=json.dumps([drug.model_dump() for drug in payload.drugs])
+        items=build_items(payload.drugs)
     )
 
     db.add(prescription)
-    db.commit()
-    db.refresh(prescription)
-
-    # Convert JSON drugs back to list
-    prescription.drugs = json.loads(prescription.drugs)
+    await db.commit()
     return prescription
 
-# 
-@router.get("/{appointment_id}", response_model=PrescriptionOut)
-def get_prescription_by_appointment(appointment_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    prescription = db.query(Prescription).filter_by(appointment_id=appointment_id).first()
-    if not prescription:
-        raise HTTPException(status_code=404, detail="Prescription not found")
-
-    # Optional: Only allow doctor or patient to view it
-    appointment = db.query(Appointment).filter_by(id=appointment_id).first()
-    if user.role == "doctor" and appointment.doctor_id != user.id:
-        raise HTTPException(status_code=403, detail="Not authorized")
-    if user.role == "patient" and appointment.patient_id != user.id:
-        raise HTTPException(status_code=403, detail="Not authorized")
-
-    return PrescriptionOut(
-        id=prescription.id,
-        appointment_id=prescription.appointment_id,
-        doctor_id=prescription.doctor_id,
-        drugs=json.loads(prescription.drugs),
-        issued_at=prescription.issued_at
-    )
-
 @router.get("/doctor", response_model=List[PrescriptionOut])
-def get_prescriptions_for_doctor(
-    db: Session = Depends(get_db), 
+async def get_prescriptions_for_doctor(
+    response: Response,
+    dates: DateRange = Depends(),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db), 
     user: User = Depends(get_current_user)
 ):
     if user.role != "doctor":
         raise HTTPException(status_code=403, detail="Only doctors can access this route")
 
-    prescriptions = db.query(Prescription).filter(Prescription.doctor_id == user.id).all()
-    
-    return [
-        PrescriptionOut(
-            id=p.id,
-            appointment_id=p.appointment_id,
-            doctor_id=p.doctor_id,
-            drugs=json.loads(p.drugs),
-            issued_at=p.issued_at
-        )
-        for p in prescriptions
-    ]
+    query = select(Prescription).where(Prescription.doctor_id == user.id).options(selectinload(Prescription.items))
+    return await paginate(db, dates.apply(query, Prescription.issued_at), PRESCRIPTION_KEYS, page, response, descending=True)
 
 
 @router.get("/patient", response_model=List[PrescriptionOut])
-def get_prescriptions_for_patient(
-    db: Session = Depends(get_db), 
+async def get_prescriptions_for_patient(
+    response: Response,
+    dates: DateRange = Depends(),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db), 
     user: User = Depends(get_current_user)
 ):
     if user.role != "patient":
         raise HTTPException(status_code=403, detail="Only patients can access this route")
 
-    prescriptions = (
-        db.query(Prescription)
+    query = (
+        select(Prescription)
         .join(Appointment, Appointment.id == Prescription.appointment_id)
-        .filter(Appointment.patient_id == user.id)
-        .all()
+        .where(Appointment.patient_id == user.id)
+        .options(selectinload(Prescription.items))
     )
-    
-    return [
-        PrescriptionOut(
-            id=p.id,
-            appointment_id=p.appointment_id,
-            doctor_id=p.doctor_id,
-            drugs=json.loads(p.drugs),
-            issued_at=p.issued_at
-        )
-        for p in prescriptions
-    ]
+    return await paginate(db, dates.apply(query, Prescription.issued_at), PRESCRIPTION_KEYS, page, response, descending=True)
 
 
+# Declared after /doctor and /patient so those paths are not captured as an appointment id
+@router.get("/{appointment_id}", response_model=PrescriptionOut)
+async def get_prescription_by_appointment(appointment_id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
+    prescription = await db.scalar(
+        select(Prescription).filter_by(appointment_id=appointment_id).options(selectinload(Prescription.items))
+    )
+    if not prescription:
+        raise HTTPException(status_code=404, detail="Prescription not found")
+
+    # Optional: Only allow doctor or patient to view it
+    appointment = await db.get(Appointment, appointment_id)
+    if user.role == "doctor" and appointment.doctor_id != user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if user.role == "patient" and appointment.patient_id != user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    return prescription
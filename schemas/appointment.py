@@ -2,6 +2,8 @@ from pydantic import BaseModel, field_validator,  Field
 from datetime import datetime
 from typing import Literal, Optional
 
+from services.scheduling import naive_utc
+
 class AppointmentStatusUpdate(BaseModel):
     status: Literal["pending", "confirmed", "cancelled"] = Field(..., example="confirmed")
 
@@ -14,6 +16,8 @@ class AppointmentCreate(BaseModel):
     @field_validator("scheduled_date")
     @classmethod
     def validate_future_date(cls, v):
+        # Working hours are matched against naive UTC times
+        v = naive_utc(v)
         if v <= datetime.now():
             raise ValueError("Appointment date must be in the future")
         return v
@@ -25,6 +29,7 @@ class AppointmentOut(BaseModel):
     id: int
     doctor_id: int
     scheduled_date: datetime
+    ends_at: Optional[datetime] = None
     reason: str
     status: str
     prescription: Optional[str] = None
@@ -0,0 +1,29 @@
+from pydantic import BaseModel, Field, model_validator
+from datetime import datetime, time
+from typing import List
+
+from services.scheduling import MAX_APPOINTMENT_MINUTES
+
+class WorkingHours(BaseModel):
+    weekday: int = Field(..., ge=0, le=6, description="0 = Monday ... 6 = Sunday")
+    start_time: time
+    end_time: time
+    # Overlap checks only look MAX_APPOINTMENT_MINUTES back, so no slot may be longer
+    slot_minutes: int = Field(30, ge=5, le=MAX_APPOINTMENT_MINUTES)
+
+    model_config = {
+        "from_attributes": True
+    }
+
+    @model_validator(mode="after")
+    def validate_range(self):
+        if self.start_time >= self.end_time:
+            raise ValueError("start_time must be before end_time")
+        return self
+
+class ScheduleUpdate(BaseModel):
+    working_hours: List[WorkingHours]
+
+class AvailabilitySlot(BaseModel):
+    start: datetime
+    end: datetime
@@ -1,6 +1,6 @@
 # schemas/drug_order.py
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
 from datetime import datetime
 
 class DrugOrderCreate(BaseModel):
@@ -28,6 +28,10 @@ class DrugOrderRequest(BaseModel):
 
 
 
+PaymentStatus = Literal["pending", "paid", "failed"]
+OrderStatus = Literal["pending", "approved", "delivered", "cancelled"]
+
+
 class UpdateOrderStatus(BaseModel):
-    payment_status: Optional[str] = None
-    order_status: Optional[str] = None
+    payment_status: Optional[PaymentStatus] = None
+    order_status: Optional[OrderStatus] = None
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
+from typing import List, Optional
 
 class NotificationOut(BaseModel):
     id: int
@@ -10,3 +11,19 @@ class NotificationOut(BaseModel):
     model_config = {
         "from_attributes": True
     }
+
+
+class MarkReadRequest(BaseModel):
+    """Either explicit ids or a watermark: everything with id <= up_to_id."""
+    ids: Optional[List[int]] = Field(None, max_length=1000)
+    up_to_id: Optional[int] = None
+
+    @model_validator(mode="after")
+    def exactly_one_selector(self):
+        if (self.ids is None) == (self.up_to_id is None):
+            raise ValueError("Provide either ids or up_to_id")
+        return self
+
+
+class UnreadCount(BaseModel):
+    unread_count: int
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Optional
 
 class PharmacyInventoryCreate(BaseModel):
     name: str
@@ -7,7 +8,9 @@ class PharmacyInventoryCreate(BaseModel):
 
 class PharmacyInventoryUpdate(BaseModel):
     name: Optional[str] = None
-    quantity: Optional[int] = None
+    quantity: Optional[int] = Field(None, ge=0)
+    # relative change, e.g. +50 for a delivery; safe against concurrent edits
+    delta: Optional[int] = None
 
 class PharmacyInventoryOut(BaseModel):
     id: int
@@ -17,3 +20,45 @@ class PharmacyInventoryOut(BaseModel):
     model_config = {
         "from_attributes": True
     }
+
+
+class InventorySearchResult(BaseModel):
+    id: int
+    name: str
+
+
+class InventoryImportError(BaseModel):
+    line: int
+    name: Optional[str] = None
+    error: str
+
+
+class InventoryImportReport(BaseModel):
+    processed: int
+    upserted: int
+    failed: int
+    errors: List[InventoryImportError]
+    committed_through_line: int
+
+    model_config = {
+        "from_attributes": True
+    }
+
+
+class StockLevel(BaseModel):
+    inventory_id: int
+    at: datetime
+    quantity: int
+
+
+class StockMovementOut(BaseModel):
+    id: int
+    kind: str
+    quantity_change: int
+    order_id: Optional[int] = None
+    user_id: Optional[int] = None
+    created_at: datetime
+
+    model_config = {
+        "from_attributes": True
+    }
@@ -7,6 +7,10 @@ class DrugItem(BaseModel):
     dosage: str
     instructions: Optional[str] = None
 
+    model_config = {
+        "from_attributes": True
+    }
+
 class PrescriptionCreate(BaseModel):
     appointment_id: int
     drugs: List[DrugItem]
@@ -0,0 +1,129 @@
+# services/email_worker.py
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal
+from models.email_job import EmailJob
+from utils.email import render_email
+
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", 50))
+# Provider limit shared by every batch this worker sends
+EMAIL_RATE_LIMIT_PER_SECOND = float(os.getenv("EMAIL_RATE_LIMIT_PER_SECOND", 10))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", 8))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", 30))
+EMAIL_RETRY_MAX_SECONDS = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", 3600))
+# How long a claimed job stays invisible to other workers; a worker that
+# dies mid-send has its jobs retried after this
+EMAIL_CLAIM_SECONDS = float(os.getenv("EMAIL_CLAIM_SECONDS", 300))
+EMAIL_POLL_INTERVAL_SECONDS = float(os.getenv("EMAIL_POLL_INTERVAL_SECONDS", 2.0))
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Spaces sends out to at most `rate` emails per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self.next_at = time.monotonic()
+
+    async def acquire(self, count: int):
+        now = time.monotonic()
+        if self.next_at > now:
+            await asyncio.sleep(self.next_at - now)
+        self.next_at = max(self.next_at, now) + count * self.interval
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff with jitter, so failed jobs don't retry in lockstep."""
+    delay = min(EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), EMAIL_RETRY_MAX_SECONDS)
+    return timedelta(seconds=random.uniform(delay / 2, delay))
+
+
+async def claim_jobs(db: AsyncSession, limit: int) -> list[EmailJob]:
+    """
+    Claim due jobs by pushing their next_attempt_at past the claim window.
+
+    The claim is committed before anything is sent, so no row lock is held
+    while waiting on the provider. SKIP LOCKED keeps concurrent workers from
+    claiming the same jobs.
+    """
+    now = datetime.utcnow()
+    jobs = (await db.scalars(
+        select(EmailJob)
+        .where(EmailJob.status == "pending", EmailJob.next_attempt_at <= now)
+        .order_by(EmailJob.next_attempt_at, EmailJob.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )).all()
+    for job in jobs:
+        job.attempts += 1
+        job.next_attempt_at = now + timedelta(seconds=EMAIL_CLAIM_SECONDS)
+    await db.commit()
+    return list(jobs)
+
+
+async def send_batch(transport, limiter: RateLimiter, batch_size: int = EMAIL_BATCH_SIZE) -> int:
+    """Send one batch of due jobs. Returns the number of jobs claimed."""
+    async with AsyncSessionLocal() as db:
+        jobs = await claim_jobs(db, min(batch_size, transport.max_batch))
+        if not jobs:
+            return 0
+
+        outcomes, unrenderable = {}, set()
+        sendable, messages = [], []
+        for job in jobs:
+            try:
+                messages.append(render_email(job.template, job.to_email, job.context))
+                sendable.append(job)
+            except (KeyError, ValueError) as e:
+                outcomes[job.id] = f"template error: {e!r}"
+                unrenderable.add(job.id)
+
+        if messages:
+            await limiter.acquire(len(messages))
+            try:
+                # Transports are blocking clients; keep them off the event loop
+                errors = await asyncio.to_thread(transport.send, messages)
+            except Exception as e:
+                logger.warning("Email batch of %d failed: %s", len(messages), e)
+                errors = [str(e) or type(e).__name__] * len(messages)
+            outcomes.update(zip((job.id for job in sendable), errors))
+
+        now = datetime.utcnow()
+        for job in jobs:
+            error = outcomes[job.id]
+            if error is None:
+                job.status = "sent"
+                job.sent_at = now
+                job.last_error = None
+                job.context = {}  # drop reset links and other secrets once delivered
+            elif job.attempts >= EMAIL_MAX_ATTEMPTS or job.id in unrenderable:
+                job.status = "failed"
+                job.last_error = error[:1000]
+            else:
+                job.next_attempt_at = now + retry_delay(job.attempts)
+                job.last_error = error[:1000]
+        await db.commit()
+    return len(jobs)
+
+
+async def run_email_worker(transport, batch_size: int = EMAIL_BATCH_SIZE):
+    """Drain the email queue until cancelled."""
+    limiter = RateLimiter(EMAIL_RATE_LIMIT_PER_SECOND)
+    while True:
+        try:
+            while await send_batch(transport, limiter, batch_size):
+                pass
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Email worker failed; retrying")
+        await asyncio.sleep(EMAIL_POLL_INTERVAL_SECONDS)
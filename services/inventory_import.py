@@ -0,0 +1,241 @@
+# services/inventory_import.py
+#
+# Bulk inventory upsert from CSV or NDJSON. Input is consumed as a stream
+# of lines and written in chunks of INVENTORY_IMPORT_CHUNK_SIZE rows, one
+# transaction each. Each row sets an absolute `quantity` or applies a
+# relative `delta`. Bad rows are reported with their line number and
+# skipped; the rest of the import goes on. A database error stops the
+# import; chunks committed before it stay applied, and the error says
+# through which line.
+import csv
+import json
+import os
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.pharmacy_inventory import PharmacyInventory
+from services.inventory_index import inventory_index
+from services.stock_ledger import ADJUSTMENT, RECEIPT, record_movements
+from utils.drug_names import normalize_drug_name
+
+INVENTORY_IMPORT_CHUNK_SIZE = int(os.getenv("INVENTORY_IMPORT_CHUNK_SIZE", 1000))
+# Errors beyond this are counted but not listed
+INVENTORY_IMPORT_MAX_ERRORS = int(os.getenv("INVENTORY_IMPORT_MAX_ERRORS", 1000))
+
+
+@dataclass
+class ImportReport:
+    processed: int = 0
+    upserted: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+    # Last input line whose chunk has been committed
+    committed_through_line: int = 0
+
+    def error(self, line: int, name, message: str):
+        self.failed += 1
+        if len(self.errors) < INVENTORY_IMPORT_MAX_ERRORS:
+            # NDJSON names are whatever JSON type the row used; the report lists strings
+            self.errors.append({"line": line, "name": None if name is None else str(name), "error": message})
+
+
+class ImportAborted(Exception):
+    """Raised when a chunk fails to commit; earlier chunks remain applied."""
+
+    def __init__(self, report: ImportReport):
+        super().__init__(f"Import stopped after line {report.committed_through_line}")
+        self.report = report
+
+
+@dataclass
+class _Change:
+    line: int
+    name: str
+    quantity: Optional[int] = None  # absolute level, if any row in the chunk set one
+    delta: int = 0
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into decoded lines without reading it all."""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig").rstrip("\r")
+    if pending:
+        yield pending.decode("utf-8-sig").rstrip("\r")
+
+
+def _parse_int(value, field_name: str) -> Optional[int]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f"{field_name} must be an integer")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field_name} must be an integer")
+
+
+def _parse_record(record: dict) -> tuple[str, Optional[int], Optional[int]]:
+    name = record.get("name")
+    if not isinstance(name, str) or not normalize_drug_name(name):
+        raise ValueError("name is required")
+    quantity = _parse_int(record.get("quantity"), "quantity")
+    delta = _parse_int(record.get("delta"), "delta")
+    if (quantity is None) == (delta is None):
+        raise ValueError("provide exactly one of quantity or delta")
+    if quantity is not None and quantity < 0:
+        raise ValueError("quantity cannot be negative")
+    return name.strip(), quantity, delta
+
+
+async def _records(lines: AsyncIterator[str], fmt: str):
+    """Yield (line number, record dict or parse error) per non-empty line."""
+    header = None
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not line.strip():
+            continue
+        if fmt == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [column.strip().lower() for column in values]
+                continue
+            yield line_no, dict(zip(header, values))
+        else:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield line_no, ValueError("invalid JSON")
+                continue
+            yield line_no, record if isinstance(record, dict) else ValueError("expected a JSON object")
+
+
+def _insert(db: AsyncSession):
+    return postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+
+
+async def _apply_chunk(db: AsyncSession, changes: dict, report: ImportReport, user_id: Optional[int]):
+    # Locked so absolute quantities can be recorded in the ledger as exact changes
+    existing = {row.normalized_name: row.quantity or 0 for row in (await db.execute(
+        select(PharmacyInventory.normalized_name, PharmacyInventory.quantity)
+        .where(PharmacyInventory.normalized_name.in_(list(changes)))
+        .order_by(PharmacyInventory.normalized_name)
+        .with_for_update()
+    )).all()}
+
+    absolute, relative = [], []
+    for key, change in changes.items():
+        if change.quantity is not None:
+            if change.quantity + change.delta < 0:
+                report.error(change.line, change.name, "stock cannot go below zero")
+                continue
+            absolute.append({"name": change.name, "normalized_name": key, "quantity": change.quantity + change.delta})
+        elif key in existing:
+            relative.append({"name": change.name, "normalized_name": key, "quantity": change.delta})
+        elif change.delta >= 0:
+            absolute.append({"name": change.name, "normalized_name": key, "quantity": change.delta})
+        else:
+            report.error(change.line, change.name, "cannot apply a negative delta to an unknown drug")
+
+    # executemany of one cached statement; a multi-VALUES insert would be
+    # recompiled for every chunk
+    insert = _insert(db)
+    table = PharmacyInventory.__table__
+    applied = set()
+    movements = {RECEIPT: {}, ADJUSTMENT: {}}
+    if absolute:
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.normalized_name],
+            set_={"quantity": stmt.excluded.quantity},
+        ).returning(table.c.id, table.c.normalized_name, table.c.quantity)
+        for row in (await db.execute(stmt, absolute)).all():
+            applied.add(row.normalized_name)
+            kind = ADJUSTMENT if row.normalized_name in existing else RECEIPT
+            movements[kind][row.id] = row.quantity - existing.get(row.normalized_name, 0)
+    if relative:
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.normalized_name],
+            set_={"quantity": table.c.quantity + stmt.excluded.quantity},
+            # checked against the current row, so concurrent orders can't be oversold
+            where=table.c.quantity + stmt.excluded.quantity >= 0,
+        ).returning(table.c.id, table.c.normalized_name)
+        for row in (await db.execute(stmt, relative)).all():
+            applied.add(row.normalized_name)
+            delta = changes[row.normalized_name].delta
+            movements[RECEIPT if delta > 0 else ADJUSTMENT][row.id] = delta
+    for kind, changed in movements.items():
+        await record_movements(db, changed, kind, user_id=user_id)
+    await db.commit()
+
+    for row in absolute + relative:
+        if row["normalized_name"] in applied:
+            report.upserted += 1
+        else:
+            change = changes[row["normalized_name"]]
+            report.error(change.line, change.name, "stock cannot go below zero")
+
+
+async def _commit_chunk(db: AsyncSession, changes: dict, report: ImportReport, user_id: Optional[int], line_no: int):
+    try:
+        await _apply_chunk(db, changes, report, user_id)
+    except SQLAlchemyError as exc:
+        await db.rollback()
+        inventory_index.invalidate()
+        report.errors.sort(key=lambda error: error["line"])
+        raise ImportAborted(report) from exc
+    report.committed_through_line = line_no
+
+
+async def import_inventory(
+    db: AsyncSession, lines: AsyncIterator[str], fmt: str, user_id: Optional[int] = None
+) -> ImportReport:
+    """
+    Upsert inventory rows read from `lines` ("csv" with a header row, or "ndjson").
+
+    Rows naming the same drug within a chunk are merged in file order: an
+    absolute quantity replaces what came before it and later deltas add on.
+    Raises ImportAborted if a chunk cannot be written.
+    """
+    report = ImportReport()
+    changes: dict[str, _Change] = {}
+    line_no = 0
+
+    async for line_no, record in _records(lines, fmt):
+        report.processed += 1
+        try:
+            if isinstance(record, Exception):
+                raise record
+            name, quantity, delta = _parse_record(record)
+        except ValueError as exc:
+            report.error(line_no, record.get("name") if isinstance(record, dict) else None, str(exc))
+            continue
+
+        key = normalize_drug_name(name)
+        change = changes.setdefault(key, _Change(line=line_no, name=name))
+        change.line = line_no
+        if quantity is not None:
+            change.quantity, change.delta = quantity, 0
+        else:
+            change.delta += delta
+
+        if len(changes) >= INVENTORY_IMPORT_CHUNK_SIZE:
+            await _commit_chunk(db, changes, report, user_id, line_no)
+            changes = {}
+
+    if changes:
+        await _commit_chunk(db, changes, report, user_id, line_no)
+    report.committed_through_line = line_no
+    inventory_index.invalidate()
+    report.errors.sort(key=lambda error: error["line"])
+    return report
@@ -0,0 +1,106 @@
+# services/inventory_index.py
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.pharmacy_inventory import PharmacyInventory
+from utils.drug_names import normalize_drug_name
+
+# Other workers' inventory edits are picked up after this long
+INVENTORY_INDEX_REFRESH_SECONDS = float(os.getenv("INVENTORY_INDEX_REFRESH_SECONDS", 60))
+
+
+class PrefixIndex:
+    """
+    In-memory prefix index over normalized drug names.
+
+    Keys are kept in one sorted list, so a lookup is a binary search for the
+    prefix followed by a forward scan of at most `limit` matches. Every word
+    start is indexed, so "500" finds "paracetamol 500mg" as well as names
+    starting with it.
+    """
+
+    def __init__(self):
+        self._keys: list[tuple[str, int]] = []
+        self._names: dict[int, tuple[str, str]] = {}  # id -> (name, normalized)
+        self._lock = threading.Lock()
+        self.loaded_at = None
+
+    @staticmethod
+    def _word_starts(normalized: str):
+        yield normalized
+        for i, char in enumerate(normalized):
+            if char == " " and i + 1 < len(normalized):
+                yield normalized[i + 1:]
+
+    def _insert(self, item_id: int, normalized: str):
+        for key in self._word_starts(normalized):
+            insort(self._keys, (key, item_id))
+
+    def _remove(self, item_id: int, normalized: str):
+        for key in self._word_starts(normalized):
+            i = bisect_left(self._keys, (key, item_id))
+            if i < len(self._keys) and self._keys[i] == (key, item_id):
+                del self._keys[i]
+
+    def upsert(self, item_id: int, name: str):
+        normalized = normalize_drug_name(name)
+        with self._lock:
+            previous = self._names.get(item_id)
+            if previous is not None:
+                self._remove(item_id, previous[1])
+            self._names[item_id] = (name, normalized)
+            self._insert(item_id, normalized)
+
+    def remove(self, item_id: int):
+        with self._lock:
+            previous = self._names.pop(item_id, None)
+            if previous is not None:
+                self._remove(item_id, previous[1])
+
+    def rebuild(self, items):
+        names = {}
+        keys = []
+        for item_id, name in items:
+            normalized = normalize_drug_name(name)
+            names[item_id] = (name, normalized)
+            keys.extend((key, item_id) for key in self._word_starts(normalized))
+        keys.sort()
+        with self._lock:
+            self._keys, self._names = keys, names
+            self.loaded_at = time.monotonic()
+
+    def search(self, query: str, limit: int = 10) -> list[dict]:
+        prefix = normalize_drug_name(query)
+        if not prefix:
+            return []
+        found = {}
+        with self._lock:
+            i = bisect_left(self._keys, (prefix,))
+            while i < len(self._keys) and len(found) < limit:
+                key, item_id = self._keys[i]
+                if not key.startswith(prefix):
+                    break
+                found.setdefault(item_id, self._names[item_id][0])
+                i += 1
+        return [{"id": item_id, "name": name} for item_id, name in found.items()]
+
+    def invalidate(self):
+        """Force a reload on the next search, e.g. after a bulk import."""
+        self.loaded_at = None
+
+    def is_stale(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > INVENTORY_INDEX_REFRESH_SECONDS
+
+
+inventory_index = PrefixIndex()
+
+
+async def refresh_inventory_index(db: AsyncSession, force: bool = False):
+    if force or inventory_index.is_stale():
+        rows = (await db.execute(select(PharmacyInventory.id, PharmacyInventory.name))).all()
+        inventory_index.rebuild(rows)
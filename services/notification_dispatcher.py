@@ -0,0 +1,86 @@
+# services/notification_dispatcher.py
+import asyncio
+import logging
+import os
+from collections import Counter
+
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.orm import Session
+
+from database import AsyncSessionLocal
+from models.notification import Notification
+from models.notification_outbox import NotificationOutbox
+from utils.notifications import OUTBOX_PENDING, increment_unread, notification_channel, serialize_notification
+from utils.pubsub import hub
+
+NOTIFICATION_DISPATCH_BATCH_SIZE = int(os.getenv("NOTIFICATION_DISPATCH_BATCH_SIZE", 500))
+# Fallback poll for events committed by other processes
+NOTIFICATION_DISPATCH_INTERVAL_SECONDS = float(os.getenv("NOTIFICATION_DISPATCH_INTERVAL_SECONDS", 1.0))
+
+logger = logging.getLogger(__name__)
+
+_wakeup = asyncio.Event()
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_after_commit(session):
+    if session.info.pop(OUTBOX_PENDING, False):
+        _wakeup.set()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session):
+    session.info.pop(OUTBOX_PENDING, None)
+
+
+async def dispatch_batch(batch_size: int = NOTIFICATION_DISPATCH_BATCH_SIZE) -> int:
+    """
+    Deliver up to `batch_size` outbox events in one transaction.
+
+    All recipients of the batch are written with a single bulk insert and
+    then pushed to their notification channel.
+    Rows are locked with SKIP LOCKED where supported, so several workers
+    can drain the outbox without delivering an event twice.
+    Returns the number of events handled.
+    """
+    async with AsyncSessionLocal() as db:
+        events = (await db.scalars(
+            select(NotificationOutbox)
+            .order_by(NotificationOutbox.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )).all()
+        if not events:
+            return 0
+
+        rows = [
+            {"user_id": user_id, "message": outbox.message, "is_read": 0, "created_at": outbox.created_at}
+            for outbox in events
+            for user_id in outbox.recipient_ids
+        ]
+        delivered = (await db.scalars(insert(Notification).returning(Notification), rows)).all() if rows else []
+        await increment_unread(db, Counter(row["user_id"] for row in rows))
+        await db.execute(delete(NotificationOutbox).where(NotificationOutbox.id.in_([outbox.id for outbox in events])))
+        await db.commit()
+
+    # Push only once committed; subscribers that miss it replay from the table
+    for notification in delivered:
+        await hub.publish(notification_channel(notification.user_id), serialize_notification(notification))
+    return len(events)
+
+
+async def run_dispatcher():
+    """Drain the outbox until cancelled."""
+    while True:
+        _wakeup.clear()
+        try:
+            while await dispatch_batch() == NOTIFICATION_DISPATCH_BATCH_SIZE:
+                pass
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Notification dispatch failed; retrying")
+        try:
+            await asyncio.wait_for(_wakeup.wait(), NOTIFICATION_DISPATCH_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,103 @@
+# services/refresh_sessions.py
+#
+# Server-side refresh sessions. Refresh tokens are opaque random strings;
+# only their SHA-256 is stored, and it is unique-indexed, so refreshing is
+# one indexed lookup with no password hashing.
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from typing import Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.refresh_session import RefreshSession
+from models.user import User
+from utils.tokens import REFRESH_TOKEN_EXPIRE_DAYS
+
+
+class InvalidRefreshToken(Exception):
+    pass
+
+
+class RefreshTokenReused(InvalidRefreshToken):
+    """A rotated token was presented again; its whole family was revoked."""
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _issue(db: AsyncSession, user_id: int, family_id: str) -> str:
+    token = secrets.token_urlsafe(32)
+    db.add(RefreshSession(
+        user_id=user_id,
+        family_id=family_id,
+        token_hash=hash_token(token),
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return token
+
+
+def start_session(db: AsyncSession, user_id: int) -> str:
+    """New refresh token in a new family. Staged in the caller's transaction."""
+    return _issue(db, user_id, uuid.uuid4().hex)
+
+
+async def _revoke_family(db: AsyncSession, family_id: str):
+    await db.execute(
+        update(RefreshSession)
+        .where(RefreshSession.family_id == family_id, RefreshSession.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+
+
+async def rotate_session(db: AsyncSession, token: str) -> Tuple[User, str]:
+    """
+    Exchange a refresh token for its successor and return (user, new token).
+
+    Commits either way: a reused token revokes its family before
+    RefreshTokenReused is raised.
+    """
+    row = (await db.execute(
+        select(RefreshSession, User)
+        .join(User, User.id == RefreshSession.user_id)
+        .where(RefreshSession.token_hash == hash_token(token))
+        .with_for_update(of=RefreshSession)
+    )).first()
+    if row is None:
+        raise InvalidRefreshToken()
+    session, user = row
+
+    now = datetime.utcnow()
+    if session.revoked_at is not None or session.expires_at <= now or user.is_active is False:
+        raise InvalidRefreshToken()
+    if session.rotated_at is not None:
+        # Only a stolen copy (or a client replaying an old token) gets here
+        await _revoke_family(db, session.family_id)
+        await db.commit()
+        raise RefreshTokenReused()
+
+    session.rotated_at = now
+    new_token = _issue(db, user.id, session.family_id)
+    await db.commit()
+    return user, new_token
+
+
+async def end_session(db: AsyncSession, token: str):
+    """Revoke the family of `token` (logout), without committing."""
+    family_id = await db.scalar(
+        select(RefreshSession.family_id).where(RefreshSession.token_hash == hash_token(token))
+    )
+    if family_id is not None:
+        await _revoke_family(db, family_id)
+
+
+async def revoke_user_sessions(db: AsyncSession, user_id: int):
+    """Revoke every refresh session of a user (password reset, deactivation), without committing."""
+    await db.execute(
+        update(RefreshSession)
+        .where(RefreshSession.user_id == user_id, RefreshSession.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
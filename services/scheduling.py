@@ -0,0 +1,139 @@
+# services/scheduling.py
+import os
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.appointment import Appointment
+from models.doctor_schedule import DoctorSchedule
+from models.user import User
+
+DEFAULT_SLOT_MINUTES = int(os.getenv("DEFAULT_SLOT_MINUTES", 30))
+# Upper bound on any appointment's length. It lets overlap checks scan a
+# bounded range of the (doctor_id, scheduled_date) index instead of every
+# earlier appointment.
+MAX_APPOINTMENT_MINUTES = int(os.getenv("MAX_APPOINTMENT_MINUTES", 240))
+
+INACTIVE_STATUSES = ("cancelled", "cancelled_by_doctor")
+
+# Rows booked before ends_at existed occupy just their start time
+_ENDS_AT = func.coalesce(Appointment.ends_at, Appointment.scheduled_date)
+
+
+class OutsideWorkingHours(Exception):
+    pass
+
+
+def naive_utc(value: datetime) -> datetime:
+    """Times are stored and compared as naive UTC; convert aware input to that."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _booked_in_range(doctor_id: int, start: datetime, end: datetime):
+    """Active appointments of a doctor that can overlap [start, end)."""
+    return select(Appointment.scheduled_date, _ENDS_AT.label("ends_at")).where(
+        Appointment.doctor_id == doctor_id,
+        Appointment.scheduled_date < end,
+        Appointment.scheduled_date > start - timedelta(minutes=MAX_APPOINTMENT_MINUTES),
+        Appointment.status.not_in(INACTIVE_STATUSES),
+    )
+
+
+async def get_schedule(db: AsyncSession, doctor_id: int) -> list[DoctorSchedule]:
+    return list((await db.scalars(
+        select(DoctorSchedule)
+        .where(DoctorSchedule.doctor_id == doctor_id)
+        .order_by(DoctorSchedule.weekday, DoctorSchedule.start_time)
+    )).all())
+
+
+def slot_end(schedule: list[DoctorSchedule], start: datetime) -> datetime:
+    """
+    End of the slot starting at `start`.
+
+    Doctors without configured hours accept any start time and get the
+    default slot length; otherwise `start` must fall on a slot boundary
+    inside their working hours.
+    """
+    if not schedule:
+        return start + timedelta(minutes=DEFAULT_SLOT_MINUTES)
+
+    for hours in schedule:
+        if hours.weekday != start.weekday():
+            continue
+        opens = datetime.combine(start.date(), hours.start_time)
+        closes = datetime.combine(start.date(), hours.end_time)
+        step = timedelta(minutes=hours.slot_minutes)
+        if opens <= start and start + step <= closes and (start - opens) % step == timedelta(0):
+            return start + step
+    raise OutsideWorkingHours()
+
+
+async def lock_doctor(db: AsyncSession, doctor_id: int):
+    """
+    Serialize slot changes for one doctor until the transaction ends.
+
+    Call it before has_conflict: concurrent bookings at different but
+    overlapping start times would otherwise both pass the check.
+    """
+    if db.bind.dialect.name == "sqlite":
+        # SQLite ignores FOR UPDATE; a no-op write takes its database write lock
+        await db.execute(
+            update(User).where(User.id == doctor_id).values(id=User.id)
+            .execution_options(synchronize_session=False)
+        )
+    else:
+        await db.execute(select(User.id).where(User.id == doctor_id).with_for_update())
+
+
+async def has_conflict(db: AsyncSession, doctor_id: int, start: datetime, end: datetime) -> bool:
+    query = _booked_in_range(doctor_id, start, end).where(
+        or_(_ENDS_AT > start, Appointment.scheduled_date >= start)
+    )
+    return (await db.execute(query.limit(1))).first() is not None
+
+
+async def get_availability(db: AsyncSession, doctor_id: int, start: datetime, end: datetime) -> list[dict]:
+    """
+    Free slots of a doctor in [start, end).
+
+    One query loads the working hours and one loads every booking in the
+    window. Each candidate slot is then checked with a binary search over
+    the bookings sorted by start, using a running max of their end times.
+    """
+    schedule = await get_schedule(db, doctor_id)
+    if not schedule:
+        return []
+
+    booked = sorted((await db.execute(_booked_in_range(doctor_id, start, end))).all())
+    booked_starts = [row.scheduled_date for row in booked]
+    max_end_before = list(accumulate((row.ends_at for row in booked), max))
+
+    def is_free(slot_start, slot_end):
+        i = bisect_left(booked_starts, slot_end)
+        if bisect_left(booked_starts, slot_start) != i:
+            return False  # a booking starts inside the slot
+        return i == 0 or max_end_before[i - 1] <= slot_start
+
+    by_weekday = {}
+    for hours in schedule:
+        by_weekday.setdefault(hours.weekday, []).append(hours)
+
+    slots = []
+    day = start.date()
+    while day <= end.date():
+        for hours in by_weekday.get(day.weekday(), []):
+            step = timedelta(minutes=hours.slot_minutes)
+            slot = datetime.combine(day, hours.start_time)
+            closes = datetime.combine(day, hours.end_time)
+            while slot + step <= closes:
+                if slot >= start and slot + step <= end and is_free(slot, slot + step):
+                    slots.append({"start": slot, "end": slot + step})
+                slot += step
+        day += timedelta(days=1)
+    return slots
@@ -0,0 +1,118 @@
+# services/stock_ledger.py
+#
+# PharmacyInventory.quantity stays the live stock level: reserve_stock needs
+# its conditional UPDATE to refuse overselling, and reads of it are O(1).
+# Every change to it also appends a StockMovement in the same transaction,
+# after the inventory row has been updated. The row lock taken by that
+# update makes each item's movements commit in id order, which is what lets
+# snapshots and as-of reads rely on ids.
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.pharmacy_inventory import PharmacyInventory
+from models.stock_movement import StockMovement, StockSnapshot
+
+RECEIPT = "receipt"
+ADJUSTMENT = "adjustment"
+DISPENSE = "dispense"
+RETURN = "return"
+REMOVAL = "removal"
+
+STOCK_SNAPSHOT_BATCH_SIZE = int(os.getenv("STOCK_SNAPSHOT_BATCH_SIZE", 500))
+
+
+async def record_movements(
+    db: AsyncSession,
+    changes: Dict[int, int],
+    kind: str,
+    order_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+):
+    """Append one ledger row per inventory id with a non-zero change, without committing."""
+    now = datetime.utcnow()
+    rows = [
+        {"inventory_id": inventory_id, "kind": kind, "quantity_change": change,
+         "order_id": order_id, "user_id": user_id, "created_at": now}
+        for inventory_id, change in sorted(changes.items())
+        if change
+    ]
+    if rows:
+        await db.execute(insert(StockMovement.__table__), rows)
+
+
+async def stock_as_of(db: AsyncSession, inventory_id: int, at: datetime) -> int:
+    """
+    Stock level of an item at `at`: the latest snapshot taken by then plus
+    the movements recorded after it, so the scan is bounded by the snapshot
+    interval rather than the item's whole history.
+    """
+    snapshot = await db.scalar(
+        select(StockSnapshot)
+        .where(StockSnapshot.inventory_id == inventory_id, StockSnapshot.taken_at <= at)
+        .order_by(StockSnapshot.taken_at.desc(), StockSnapshot.id.desc())
+        .limit(1)
+    )
+    base, after_id = (snapshot.quantity, snapshot.last_movement_id) if snapshot else (0, 0)
+    delta = await db.scalar(
+        select(func.coalesce(func.sum(StockMovement.quantity_change), 0))
+        .where(
+            StockMovement.inventory_id == inventory_id,
+            StockMovement.id > after_id,
+            StockMovement.created_at <= at,
+        )
+    )
+    return base + delta
+
+
+async def take_snapshots(db: AsyncSession, batch_size: int = STOCK_SNAPSHOT_BATCH_SIZE) -> int:
+    """
+    Snapshot every item with movements newer than its latest snapshot.
+
+    Items are locked a batch at a time, so the quantity read and the last
+    movement id always describe the same point in the ledger.
+    Returns the number of snapshots written.
+    """
+    latest = (
+        select(StockSnapshot.inventory_id, func.max(StockSnapshot.last_movement_id).label("last_id"))
+        .group_by(StockSnapshot.inventory_id)
+        .subquery()
+    )
+    pending = (await db.scalars(
+        select(StockMovement.inventory_id)
+        .outerjoin(latest, latest.c.inventory_id == StockMovement.inventory_id)
+        .group_by(StockMovement.inventory_id)
+        .having(func.max(StockMovement.id) > func.coalesce(func.max(latest.c.last_id), 0))
+        .order_by(StockMovement.inventory_id)
+    )).all()
+    await db.commit()
+
+    written = 0
+    for start in range(0, len(pending), batch_size):
+        ids = pending[start:start + batch_size]
+        levels = dict((await db.execute(
+            select(PharmacyInventory.id, PharmacyInventory.quantity)
+            .where(PharmacyInventory.id.in_(ids))
+            .order_by(PharmacyInventory.id)
+            .with_for_update()
+        )).all())
+        last_ids = dict((await db.execute(
+            select(StockMovement.inventory_id, func.max(StockMovement.id))
+            .where(StockMovement.inventory_id.in_(list(levels)))
+            .group_by(StockMovement.inventory_id)
+        )).all())
+        now = datetime.utcnow()
+        rows = [
+            {"inventory_id": inventory_id, "quantity": quantity or 0,
+             "last_movement_id": last_ids[inventory_id], "taken_at": now}
+            for inventory_id, quantity in levels.items()
+            if inventory_id in last_ids
+        ]
+        if rows:
+            await db.execute(insert(StockSnapshot.__table__), rows)
+        await db.commit()
+        written += len(rows)
+    return written
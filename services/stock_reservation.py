@@ -0,0 +1,103 @@
+# services/stock_reservation.py
+from collections import Counter
+
+from sqlalchemy import case, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.pharmacy_inventory import PharmacyInventory
+from utils.drug_names import normalize_drug_name
+
+
+class StockShortfall(Exception):
+    """Raised when one or more drugs cannot be reserved."""
+
+    def __init__(self, shortfalls: list[dict]):
+        super().__init__("Insufficient stock")
+        self.shortfalls = shortfalls
+
+
+def _requested(drug_names: list[str]) -> tuple[Counter, dict]:
+    """Units needed per normalized name, plus a display name for each."""
+    requested, display = Counter(), {}
+    for name in drug_names:
+        key = normalize_drug_name(name)
+        requested[key] += 1
+        display.setdefault(key, name)
+    return requested, display
+
+
+def _shortfalls(requested: Counter, available: dict, display: dict) -> list[dict]:
+    return [
+        {"name": display[key], "requested": quantity, "available": available.get(key, 0)}
+        for key, quantity in requested.items()
+        if available.get(key, 0) < quantity
+    ]
+
+
+async def _available(db: AsyncSession, names, lock: bool = False) -> dict:
+    query = (
+        select(PharmacyInventory.id, PharmacyInventory.normalized_name, PharmacyInventory.quantity)
+        .where(PharmacyInventory.normalized_name.in_(names))
+        .order_by(PharmacyInventory.id)  # consistent lock order avoids deadlocks
+    )
+    if lock:
+        query = query.with_for_update()
+    return {row.normalized_name: row for row in (await db.execute(query)).all()}
+
+
+async def reserve_stock(db: AsyncSession, drug_names: list[str]) -> dict[int, int]:
+    """
+    Take one unit of stock per prescribed drug, all or nothing. Names are
+    matched on their normalized form, so letter case and spacing in the
+    prescription do not matter.
+
+    Availability is resolved in a single IN query (row-locked where the
+    backend supports it) and consumed by a single conditional UPDATE, so
+    concurrent orders cannot oversell. On StockShortfall the caller must
+    roll back the transaction. Returns the units taken per inventory id.
+    """
+    requested, display = _requested(drug_names)
+    if not requested:
+        return {}  # an empty CASE is not valid SQL
+    rows = await _available(db, list(requested), lock=True)
+
+    shortfalls = _shortfalls(requested, {key: row.quantity or 0 for key, row in rows.items()}, display)
+    if shortfalls:
+        raise StockShortfall(shortfalls)
+
+    needed = {rows[key].id: quantity for key, quantity in requested.items()}
+    amount = case(needed, value=PharmacyInventory.id)
+    result = await db.execute(
+        update(PharmacyInventory)
+        .where(PharmacyInventory.id.in_(needed), PharmacyInventory.quantity >= amount)
+        .values(quantity=PharmacyInventory.quantity - amount)
+        .execution_options(synchronize_session=False)
+    )
+
+    # Another order won the race for at least one row; report current levels.
+    if result.rowcount != len(needed):
+        rows = await _available(db, list(requested))
+        raise StockShortfall(_shortfalls(requested, {key: row.quantity or 0 for key, row in rows.items()}, display))
+    return needed
+
+
+async def release_stock(db: AsyncSession, drug_names: list[str]) -> dict[int, int]:
+    """
+    Return previously reserved units to stock, e.g. when an order is
+    cancelled. Returns the units put back per inventory id.
+    """
+    requested, _ = _requested(drug_names)
+    if not requested:
+        return {}
+    rows = await _available(db, list(requested), lock=True)
+    returned = {row.id: requested[key] for key, row in rows.items()}
+    if not returned:
+        return returned
+    amount = case(returned, value=PharmacyInventory.id)
+    await db.execute(
+        update(PharmacyInventory)
+        .where(PharmacyInventory.id.in_(returned))
+        .values(quantity=PharmacyInventory.quantity + amount)
+        .execution_options(synchronize_session=False)
+    )
+    return returned
@@ -0,0 +1,34 @@
+# snapshot_stock.py
+#
+# Records the current stock level of every item that has moved since its
+# last snapshot, so GET /api/pharmacy/inventory/{id}/stock?at=... only sums
+# the ledger rows after the nearest snapshot. Run it from cron, e.g. nightly:
+#
+#     python snapshot_stock.py --batch-size 500
+
+import argparse
+import asyncio
+import time
+
+from database import AsyncSessionLocal
+from models import user, appointment, prescription_model, drug_order  # noqa: F401  (registers the tables the ledger refers to)
+from services.stock_ledger import STOCK_SNAPSHOT_BATCH_SIZE, take_snapshots
+
+
+async def run(batch_size: int):
+    started = time.monotonic()
+    async with AsyncSessionLocal() as db:
+        written = await take_snapshots(db, batch_size)
+    print(f"Done. {written} snapshots written in {time.monotonic() - started:.1f}s.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot pharmacy stock levels.")
+    parser.add_argument("--batch-size", type=int, default=STOCK_SNAPSHOT_BATCH_SIZE,
+                        help="items locked and snapshotted per transaction")
+    args = parser.parse_args()
+    asyncio.run(run(args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
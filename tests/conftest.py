@@ -0,0 +1,66 @@
+# tests/conftest.py
+#
+# Configuration is read when the app modules are imported, so the
+# environment is set first: a throwaway SQLite database, no auth rate
+# limits and an in-memory email transport.
+import os
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+
+TEST_DIR = tempfile.mkdtemp(prefix="smart-health-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DIR}/test.db"
+os.environ["RATE_LIMITS_PER_IP"] = ""
+os.environ["RATE_LIMITS_PER_ACCOUNT"] = ""
+os.environ["EMAIL_TRANSPORT"] = "fake"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from database import Base, engine
+from models import user, appointment, prescription_model, drug_order, pharmacy_inventory, notification, doctor_schedule, idempotency_key, notification_outbox, notification_counter, stock_movement, email_job, token_revocation, refresh_session  # noqa: F401
+
+ADMIN_EMAIL = "admin@hospital.com"
+ADMIN_PASSWORD = "SuperSecure123"
+PASSWORD = "test-password"
+
+
+def login(client, email: str, password: str = PASSWORD) -> dict:
+    response = client.post("/api/auth/login", json={"email": email, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def future_slot(days: int = 1) -> str:
+    return (datetime.now() + timedelta(days=days)).replace(hour=10, minute=0, second=0, microsecond=0).isoformat()
+
+
+@pytest.fixture(scope="session")
+def client():
+    Base.metadata.create_all(bind=engine)
+    from main import app
+
+    with TestClient(app, raise_server_exceptions=False) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def admin(client) -> dict:
+    return login(client, ADMIN_EMAIL, ADMIN_PASSWORD)
+
+
+def create_patient(client):
+    """Register a new patient; returns (auth headers, user id)."""
+    email = f"patient-{uuid.uuid4().hex[:12]}@example.com"
+    response = client.post("/api/auth/register", json={"email": email, "password": PASSWORD, "full_name": "Test Patient"})
+    assert response.status_code == 200, response.text
+    return login(client, email), response.json()["id"]
+
+
+def create_doctor(client, admin):
+    """Create a new doctor; returns (auth headers, user id)."""
+    email = f"doctor-{uuid.uuid4().hex[:12]}@example.com"
+    response = client.post("/api/admin/create-doctor", json={"email": email, "password": PASSWORD, "full_name": "Test Doctor"}, headers=admin)
+    assert response.status_code == 200, response.text
+    return login(client, email), response.json()["id"]
+
@@ -0,0 +1,29 @@
+from services.scheduling import MAX_APPOINTMENT_MINUTES
+from tests.conftest import create_doctor, create_patient
+
+WORKING_HOURS = [{"weekday": 0, "start_time": "09:00", "end_time": "10:00", "slot_minutes": 30}]
+
+
+def test_offset_times_are_read_as_utc(client, admin):
+    doctor, doctor_id = create_doctor(client, admin)
+    patient, _ = create_patient(client)
+    response = client.put(f"/api/doctors/{doctor_id}/schedule", json={"working_hours": WORKING_HOURS}, headers=doctor)
+    assert response.status_code == 200, response.text
+
+    # 10:30 in Lagos is 09:30 UTC, the second slot of Monday 2030-01-07
+    response = client.post("/api/appointments/book", json={"doctor_id": doctor_id, "scheduled_date": "2030-01-07T10:30:00+01:00", "reason": "offset"}, headers=patient)
+    assert response.status_code == 200, response.text
+    assert response.json()["scheduled_date"] == "2030-01-07T09:30:00"
+
+    response = client.get(f"/api/doctors/{doctor_id}/availability", params={"from": "2030-01-07T00:00:00Z", "to": "2030-01-08T00:00:00Z"})
+    assert response.status_code == 200, response.text
+    assert response.json() == [{"start": "2030-01-07T09:00:00", "end": "2030-01-07T09:30:00"}]
+
+
+def test_slots_cannot_exceed_the_overlap_scan_window(client, admin):
+    doctor, doctor_id = create_doctor(client, admin)
+    too_long = [{**WORKING_HOURS[0], "end_time": "23:00", "slot_minutes": MAX_APPOINTMENT_MINUTES + 5}]
+
+    response = client.put(f"/api/doctors/{doctor_id}/schedule", json={"working_hours": too_long}, headers=doctor)
+
+    assert response.status_code == 422
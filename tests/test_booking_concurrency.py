@@ -0,0 +1,50 @@
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+
+import httpx
+
+from main import app
+from tests.conftest import create_doctor, create_patient, future_slot
+
+PATIENTS = 5
+BOOKINGS_PER_PATIENT = 10
+
+
+async def book_all(requests):
+    # Run through client.portal: the async engine's pool belongs to the app's event loop
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        return await asyncio.gather(*(
+            client.post("/api/appointments/book", json=body, headers=headers) for headers, body in requests
+        ))
+
+
+def test_parallel_bookings_for_one_slot_admit_exactly_one(client, admin):
+    _, doctor_id = create_doctor(client, admin)
+    patients = [create_patient(client)[0] for _ in range(PATIENTS)]
+    body = {"doctor_id": doctor_id, "scheduled_date": future_slot(7), "reason": "stress"}
+
+    responses = client.portal.call(book_all, [(headers, body) for headers in patients] * BOOKINGS_PER_PATIENT)
+
+    assert Counter(response.status_code for response in responses) == {200: 1, 409: PATIENTS * BOOKINGS_PER_PATIENT - 1}
+    booked = client.get("/api/appointments/my", headers=next(
+        headers for headers, response in zip(patients * BOOKINGS_PER_PATIENT, responses) if response.status_code == 200
+    ))
+    assert [appointment["doctor_id"] for appointment in booked.json()] == [doctor_id]
+
+
+def test_parallel_bookings_at_overlapping_start_times_admit_exactly_one(client, admin):
+    # Without working hours every slot lasts DEFAULT_SLOT_MINUTES (30), so
+    # starts one minute apart all overlap while missing the unique index
+    _, doctor_id = create_doctor(client, admin)
+    patients = [create_patient(client)[0] for _ in range(PATIENTS)]
+    first = datetime.fromisoformat(future_slot(8))
+    requests = [
+        (patients[i % PATIENTS], {"doctor_id": doctor_id, "scheduled_date": (first + timedelta(minutes=i)).isoformat(), "reason": "stress"})
+        for i in range(20)
+    ]
+
+    responses = client.portal.call(book_all, requests)
+
+    assert Counter(response.status_code for response in responses) == {200: 1, 409: len(requests) - 1}
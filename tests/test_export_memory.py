@@ -0,0 +1,92 @@
+# Streams a large export from a real uvicorn process and checks that the
+# server's peak RSS grows by no more than a fixed ceiling. TestClient and
+# httpx's ASGI transport buffer whole responses, so they cannot show this.
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, text
+
+from database import Base
+from tests.conftest import ADMIN_EMAIL, ADMIN_PASSWORD, TEST_DIR
+
+EXPORT_ROWS = int(os.getenv("EXPORT_TEST_ROWS", 200_000))
+RSS_GROWTH_CEILING_MB = 64
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+pytestmark = pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="reads peak RSS from /proc")
+
+
+def peak_rss_mb(pid: int) -> float:
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith("VmHWM:"):
+            return int(line.split()[1]) / 1024
+    raise AssertionError("VmHWM missing from /proc status")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def export_server():
+    database_url = f"sqlite:///{TEST_DIR}/export.db"
+    seed = create_engine(database_url)
+    Base.metadata.create_all(bind=seed)
+    with seed.begin() as conn:
+        conn.execute(text(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :rows) "
+            "INSERT INTO drug_orders (prescription_id, patient_id, delivery_address, total_amount, "
+            "payment_status, order_status, created_at) "
+            "SELECT i, 1, '12 Export Street, Lagos', i, 'paid', 'delivered', '2026-01-01 00:00:00.000000' FROM n"
+        ), {"rows": EXPORT_ROWS})
+    seed.dispose()
+
+    port = free_port()
+    env = {**os.environ, "DATABASE_URL": database_url}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                httpx.get(f"{base_url}/metrics")
+                break
+            except httpx.TransportError:
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise
+                time.sleep(0.2)
+        yield server, base_url
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+def test_export_streams_in_bounded_memory(export_server, fmt):
+    server, base_url = export_server
+    token = httpx.post(f"{base_url}/api/auth/login", json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    # Warm up imports, the connection pool and the serializers first
+    httpx.get(f"{base_url}/api/admin/exports/users", params={"format": fmt}, headers=headers)
+    baseline = peak_rss_mb(server.pid)
+
+    lines = 0
+    with httpx.stream("GET", f"{base_url}/api/admin/exports/orders", params={"format": fmt}, headers=headers, timeout=300) as response:
+        assert response.status_code == 200
+        for _ in response.iter_lines():
+            lines += 1
+
+    assert lines == EXPORT_ROWS + (1 if fmt == "csv" else 0)  # csv has a header row
+    growth = peak_rss_mb(server.pid) - baseline
+    assert growth <= RSS_GROWTH_CEILING_MB, f"peak RSS grew by {growth:.0f} MB exporting {EXPORT_ROWS} rows"
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from database import SessionLocal
+from models.idempotency_key import IdempotencyKey
+from prune_idempotency_keys import prune
+from tests.conftest import create_doctor, create_patient, future_slot
+from utils.idempotency import IDEMPOTENCY_KEY_TTL_HOURS
+
+
+def age_keys(user_id: int, hours: int):
+    with SessionLocal() as db:
+        db.execute(update(IdempotencyKey).where(IdempotencyKey.user_id == user_id)
+                   .values(created_at=datetime.utcnow() - timedelta(hours=hours)))
+        db.commit()
+
+
+def book(client, patient, doctor_id, days, key):
+    body = {"doctor_id": doctor_id, "scheduled_date": future_slot(days), "reason": "idempotency"}
+    return client.post("/api/appointments/book", json=body, headers={**patient, "Idempotency-Key": key})
+
+
+def test_expired_keys_are_not_replayed(client, admin):
+    _, doctor_id = create_doctor(client, admin)
+    patient, patient_id = create_patient(client)
+    first = book(client, patient, doctor_id, 9, "retry-me")
+    assert first.status_code == 200, first.text
+    assert book(client, patient, doctor_id, 9, "retry-me").headers.get("Idempotent-Replayed") == "true"
+
+    age_keys(patient_id, IDEMPOTENCY_KEY_TTL_HOURS + 1)
+    # Past the TTL the key is free again, even for a different request
+    second = book(client, patient, doctor_id, 10, "retry-me")
+
+    assert second.status_code == 200, second.text
+    assert "Idempotent-Replayed" not in second.headers
+    assert second.json()["id"] != first.json()["id"]
+
+
+def test_prune_deletes_only_expired_keys(client, admin):
+    _, doctor_id = create_doctor(client, admin)
+    old_patient, old_id = create_patient(client)
+    new_patient, new_id = create_patient(client)
+    assert book(client, old_patient, doctor_id, 11, "old").status_code == 200
+    assert book(client, new_patient, doctor_id, 12, "new").status_code == 200
+    age_keys(old_id, IDEMPOTENCY_KEY_TTL_HOURS + 1)
+
+    prune(IDEMPOTENCY_KEY_TTL_HOURS, batch_size=1)
+
+    with SessionLocal() as db:
+        owners = set(db.scalars(select(IdempotencyKey.user_id).where(IdempotencyKey.user_id.in_([old_id, new_id]))))
+    assert owners == {new_id}
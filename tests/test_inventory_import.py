@@ -0,0 +1,58 @@
+import json
+
+from sqlalchemy import text
+
+from services import inventory_import
+
+
+def bulk_import(client, admin, rows):
+    body = "\n".join(json.dumps(row) for row in rows)
+    return client.post("/api/pharmacy/inventory/bulk", params={"format": "ndjson"}, content=body, headers=admin)
+
+
+def test_non_string_names_are_reported_as_strings(client, admin):
+    response = bulk_import(client, admin, [
+        {"name": "Import Test Cetirizine", "quantity": 3},
+        {"name": 5, "quantity": 1},
+        {"name": ["a"], "quantity": 1},
+    ])
+
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert report["processed"] == 3
+    assert report["upserted"] == 1
+    assert [(error["line"], error["name"]) for error in report["errors"]] == [(2, "5"), (3, "['a']")]
+
+
+def test_rows_without_a_name_report_none(client, admin):
+    response = bulk_import(client, admin, [{"quantity": 1}])
+
+    assert response.status_code == 200, response.text
+    assert response.json()["errors"][0]["name"] is None
+
+
+def test_database_error_reports_the_last_committed_line(client, admin, monkeypatch):
+    monkeypatch.setattr(inventory_import, "INVENTORY_IMPORT_CHUNK_SIZE", 2)
+    apply_chunk = inventory_import._apply_chunk
+    chunks = []
+
+    async def failing_second_chunk(db, changes, report, user_id):
+        chunks.append(changes)
+        if len(chunks) == 2:
+            await db.execute(text("INSERT INTO no_such_table VALUES (1)"))
+        await apply_chunk(db, changes, report, user_id)
+
+    monkeypatch.setattr(inventory_import, "_apply_chunk", failing_second_chunk)
+    response = bulk_import(client, admin, [
+        {"name": "Abort Test Loratadine", "quantity": 4},
+        {"name": "Abort Test Fexofenadine", "quantity": 5},
+        {"name": "Abort Test Desloratadine", "quantity": 6},
+        {"name": "Abort Test Levocetirizine", "quantity": 7},
+    ])
+
+    assert response.status_code == 500, response.text
+    detail = response.json()["error"]
+    assert detail["report"]["committed_through_line"] == 2
+    assert detail["report"]["upserted"] == 2
+    names = {item["name"] for item in client.get("/api/pharmacy/inventory/search", params={"q": "abort test"}, headers=admin).json()}
+    assert names == {"Abort Test Loratadine", "Abort Test Fexofenadine"}
@@ -0,0 +1,44 @@
+from sqlalchemy import select
+
+from database import SessionLocal
+from models.user import User
+from tests.conftest import create_patient
+from utils.principal_cache import principal_cache
+
+
+def cached_user(email: str) -> User:
+    with SessionLocal() as db:
+        user = db.scalar(select(User).where(User.email == email))
+        principal_cache.put(user)
+    return user
+
+
+def test_updates_invalidate_only_once_committed(client):
+    headers, _ = create_patient(client)
+    email = client.get("/api/auth/me", headers=headers).json()["email"]
+    cached_user(email)
+
+    with SessionLocal() as db:
+        user = db.scalar(select(User).where(User.email == email))
+        user.is_active = False
+        db.flush()
+        # Not visible to other connections yet, so the cached row is still the truth
+        assert principal_cache.get(email).is_active is not False
+        db.commit()
+
+    assert principal_cache.get(email) is None
+    assert client.get("/api/auth/me", headers=headers).status_code == 401
+
+
+def test_rolled_back_updates_keep_the_cache(client):
+    headers, _ = create_patient(client)
+    email = client.get("/api/auth/me", headers=headers).json()["email"]
+    cached_user(email)
+
+    with SessionLocal() as db:
+        user = db.scalar(select(User).where(User.email == email))
+        user.full_name = "Renamed"
+        db.flush()
+        db.rollback()
+
+    assert principal_cache.get(email).full_name == "Test Patient"
@@ -0,0 +1,69 @@
+import asyncio
+
+from utils import pubsub
+from utils.pubsub import Hub, RedisBackend
+
+PREFIX = "test:"
+
+
+class FakePubSub:
+    """Yields `messages` on one channel, then fails like a dropped connection or idles."""
+
+    def __init__(self, messages, drop: bool = False, subscribe_error: Exception = None):
+        self.messages = messages
+        self.drop = drop
+        self.subscribe_error = subscribe_error
+        self.closed = False
+
+    async def psubscribe(self, pattern):
+        if self.subscribe_error is not None:
+            raise self.subscribe_error
+
+    async def listen(self):
+        yield {"type": "psubscribe", "channel": f"{PREFIX}*", "data": 1}
+        for message in self.messages:
+            yield {"type": "pmessage", "channel": f"{PREFIX}user:1", "data": message}
+        if self.drop:
+            raise ConnectionError("Connection closed by server.")
+        await asyncio.Event().wait()
+
+    async def aclose(self):
+        self.closed = True
+
+
+class FakeRedis:
+    def __init__(self, *connections):
+        self.connections = list(connections)
+
+    def pubsub(self):
+        return self.connections.pop(0)
+
+
+def fake_backend(*connections) -> RedisBackend:
+    backend = RedisBackend.__new__(RedisBackend)  # skips the optional redis import
+    backend._redis, backend._prefix, backend._reader = FakeRedis(*connections), PREFIX, None
+    return backend
+
+
+def test_reader_resubscribes_after_the_connection_drops(monkeypatch, caplog):
+    monkeypatch.setattr(pubsub, "PUBSUB_RECONNECT_MIN_SECONDS", 0)
+    dropped = FakePubSub(["first"], drop=True)
+    refused = FakePubSub([], subscribe_error=ConnectionError("Connection refused"))
+    backend = fake_backend(dropped, refused, FakePubSub(["second"]))
+    hub = Hub(backend)
+
+    async def run():
+        async with hub.subscribe("user:1") as subscription:
+            first = await subscription.get(timeout=1)
+            second = await subscription.get(timeout=1)
+            lagging = subscription.lagging
+        backend._reader.cancel()
+        return first, second, lagging
+
+    first, second, lagging = asyncio.run(run())
+
+    assert (first, second) == ("first", "second")
+    # Whatever was published while disconnected is replayed by reconnecting clients
+    assert lagging
+    assert dropped.closed
+    assert "Redis pub/sub reader failed" in caplog.text
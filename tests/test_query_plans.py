@@ -0,0 +1,141 @@
+# Runs the routers' queries against the seeded test database and checks
+# each statement's SQLite EXPLAIN QUERY PLAN: a bare "SCAN <table>", i.e.
+# a full table scan without an index, fails the test.
+#
+# Unfiltered exports are left out: they read whole tables by design. The
+# SSE stream never ends under TestClient, so its replay query is checked
+# directly.
+import re
+import uuid
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from database import RequestDBStats, async_engine, engine, request_db_stats
+from routers.notifications import replay_since
+from tests.conftest import create_doctor, create_patient, future_slot
+from utils.response_cache import user_directory_cache
+
+FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+# (role, method, path, json body); paths are formatted with the seeded ids
+ROUTER_QUERIES = [
+    ("patient", "GET", "/api/appointments/my", None),
+    ("patient", "GET", "/api/appointments/my?status=pending&from=2020-01-01T00:00:00", None),
+    ("doctor", "GET", "/api/appointments/doctor", None),
+    ("doctor", "GET", "/api/appointments/doctor?status=completed", None),
+    ("patient", "POST", "/api/appointments/book", {"doctor_id": "{doctor_id}", "scheduled_date": "{next_slot}", "reason": "follow-up"}),
+    ("doctor", "PATCH", "/api/appointments/{next_appointment_id}/status", {"status": "confirmed"}),
+    ("patient", "GET", "/api/doctors/{doctor_id}/availability?from=2030-01-07T00:00:00&to=2030-01-08T00:00:00", None),
+    ("patient", "GET", "/api/doctors", None),
+    ("patient", "GET", "/api/doctors?specialization={specialization}", None),
+    ("patient", "GET", "/api/appointments/doctors", None),
+    ("patient", "GET", "/api/appointments/patients", None),
+    ("admin", "GET", "/api/admin/doctors", None),
+    ("admin", "GET", "/api/admin/patients", None),
+    ("admin", "GET", "/api/admin/exports/orders?from=2030-01-01T00:00:00", None),
+    ("admin", "GET", "/api/admin/exports/appointments?from=2030-01-01T00:00:00", None),
+    ("admin", "GET", "/api/admin/exports/prescriptions?from=2030-01-01T00:00:00", None),
+    ("patient", "GET", "/api/notifications/", None),
+    ("doctor", "GET", "/api/notifications/unread-count", None),
+    ("doctor", "GET", "/api/prescriptions/doctor", None),
+    ("patient", "GET", "/api/prescriptions/patient", None),
+    ("patient", "GET", "/api/prescriptions/{appointment_id}", None),
+    ("patient", "POST", "/api/pharmacy/order", {"prescription_id": "{prescription_id}", "delivery_address": "1 Test Street"}),
+    ("patient", "GET", "/api/pharmacy/orders/my", None),
+    ("admin", "GET", "/api/pharmacy/orders", None),
+    ("admin", "GET", "/api/pharmacy/orders?order_status=pending", None),
+    ("admin", "GET", "/api/pharmacy/inventory/{inventory_id}/stock", None),
+    ("admin", "GET", "/api/pharmacy/inventory/{inventory_id}/movements", None),
+]
+
+
+@contextmanager
+def captured_statements():
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        # Only the request's own queries, not the background workers'
+        if request_db_stats.get() is not None and statement.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE")):
+            statements.append((statement, parameters))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+
+
+def full_scans(statement: str, parameters) -> list[str]:
+    with engine.connect() as conn:
+        plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", tuple(parameters)).all()
+    return [row.detail for row in plan if FULL_SCAN.match(row.detail)]
+
+
+def ok(response) -> dict:
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.fixture(scope="module")
+def seeded(client, admin):
+    doctor, doctor_id = create_doctor(client, admin)
+    patient, patient_id = create_patient(client)
+    specialization = f"plan-test-{uuid.uuid4().hex[:8]}"
+    # Every weekday, so the 10:00 future slots and the availability window are all open
+    working_hours = [{"weekday": day, "start_time": "09:00", "end_time": "17:00", "slot_minutes": 30} for day in range(7)]
+    ok(client.put(f"/api/doctors/{doctor_id}/schedule", json={"working_hours": working_hours}, headers=doctor))
+
+    drug = ok(client.post("/api/pharmacy/inventory", json={"name": f"Plan Test {specialization}", "quantity": 10}, headers=admin))
+    appointment_id = ok(client.post("/api/appointments/book", json={"doctor_id": doctor_id, "scheduled_date": future_slot(3), "reason": "checkup"}, headers=patient))["id"]
+    ok(client.put(f"/api/appointments/{appointment_id}/complete", headers=doctor))
+    prescription = ok(client.post("/api/prescriptions/", json={"appointment_id": appointment_id, "drugs": [{"name": drug["name"], "dosage": "1"}]}, headers=doctor))
+    next_appointment = ok(client.post("/api/appointments/book", json={"doctor_id": doctor_id, "scheduled_date": future_slot(4), "reason": "review"}, headers=patient))
+    ok(client.patch(f"/api/appointments/{next_appointment['id']}/status", json={"status": "cancelled"}, headers=patient))
+    # A booking inside the availability window, so the bookings-range query runs too
+    ok(client.post("/api/appointments/book", json={"doctor_id": doctor_id, "scheduled_date": "2030-01-07T10:00:00", "reason": "planned"}, headers=patient))
+
+    return {
+        "headers": {"admin": admin, "doctor": doctor, "patient": patient},
+        "ids": {
+            "doctor_id": doctor_id, "patient_id": patient_id, "appointment_id": appointment_id,
+            "prescription_id": prescription["id"], "inventory_id": drug["id"],
+            "next_appointment_id": next_appointment["id"], "next_slot": future_slot(5),
+            "specialization": specialization,
+        },
+    }
+
+
+def fill(value, ids):
+    if isinstance(value, dict):
+        return {key: fill(item, ids) for key, item in value.items()}
+    if isinstance(value, str) and value.startswith("{") and value.endswith("}") and value[1:-1] in ids:
+        return ids[value[1:-1]]  # keep ints as ints in JSON bodies
+    return value.format(**ids) if isinstance(value, str) else value
+
+
+@pytest.mark.parametrize("role, method, path, body", ROUTER_QUERIES, ids=[f"{method} {path}" for _, method, path, _ in ROUTER_QUERIES])
+def test_router_queries_use_indexes(client, seeded, role, method, path, body):
+    user_directory_cache.invalidate()  # so cached listings run their queries
+    with captured_statements() as statements:
+        response = client.request(method, fill(path, seeded["ids"]), json=fill(body, seeded["ids"]), headers=seeded["headers"][role])
+    assert response.status_code < 400, response.text
+    assert_no_full_scans(statements)
+
+
+def assert_no_full_scans(statements):
+    assert statements, "the request ran no queries"
+    scans = {statement: found for statement, parameters in statements if (found := full_scans(statement, parameters))}
+    assert not scans, "full table scans:\n" + "\n\n".join(f"{found}\n{statement}" for statement, found in scans.items())
+
+
+def test_notification_stream_replay_uses_indexes(client, seeded):
+    async def replay():
+        request_db_stats.set(RequestDBStats())
+        return [notification async for notification in replay_since(seeded["ids"]["doctor_id"], 0)]
+
+    with captured_statements() as statements:
+        replayed = client.portal.call(replay)
+    assert replayed
+    assert_no_full_scans(statements)
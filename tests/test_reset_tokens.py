@@ -0,0 +1,34 @@
+from tests.conftest import PASSWORD, create_patient, login
+
+
+def reset_token(client, headers) -> tuple[str, str]:
+    email = client.get("/api/auth/me", headers=headers).json()["email"]
+    response = client.post("/api/auth/forgot-password", json={"email": email})
+    assert response.status_code == 200, response.text
+    return email, response.json()["reset_token"]
+
+
+def test_reset_tokens_are_not_bearer_tokens(client):
+    headers, _ = create_patient(client)
+    _, token = reset_token(client, headers)
+
+    assert client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+
+
+def test_access_tokens_cannot_reset_passwords(client):
+    headers, _ = create_patient(client)
+    access_token = headers["Authorization"].removeprefix("Bearer ")
+
+    response = client.post("/api/auth/reset-password", json={"token": access_token, "new_password": "hijacked"})
+
+    assert response.status_code == 400
+
+
+def test_reset_token_sets_a_new_password(client):
+    headers, _ = create_patient(client)
+    email, token = reset_token(client, headers)
+
+    response = client.post("/api/auth/reset-password", json={"token": token, "new_password": PASSWORD + "-new"})
+
+    assert response.status_code == 200, response.text
+    login(client, email, PASSWORD + "-new")
@@ -0,0 +1,38 @@
+from sqlalchemy import select
+
+from database import SessionLocal
+from models.user import User
+from tests.conftest import create_patient
+from utils.response_cache import user_directory_cache
+
+
+def rename(user_id: int, commit: bool) -> tuple[int, int]:
+    """Directory cache versions after the flush and after commit or rollback."""
+    with SessionLocal() as db:
+        user = db.scalar(select(User).where(User.id == user_id))
+        user.full_name = "Renamed Patient"
+        db.flush()
+        flushed = user_directory_cache.version
+        db.commit() if commit else db.rollback()
+    return flushed, user_directory_cache.version
+
+
+def test_directories_are_invalidated_only_after_commit(client):
+    _, patient_id = create_patient(client)
+    before = user_directory_cache.version
+
+    assert rename(patient_id, commit=True) == (before, before + 1)
+
+
+def test_rolled_back_user_changes_keep_the_directories(client):
+    _, patient_id = create_patient(client)
+    before = user_directory_cache.version
+
+    assert rename(patient_id, commit=False) == (before, before)
+
+
+def test_new_users_appear_in_the_cached_directory(client):
+    assert client.get("/api/appointments/patients").status_code == 200  # fill the cache
+    _, patient_id = create_patient(client)
+
+    assert patient_id in [patient["id"] for patient in client.get("/api/appointments/patients").json()]
@@ -1,59 +1,99 @@
 # utils/dependencies.py
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from sqlalchemy.orm import Session
-from database import SessionLocal
+#
+# Single home for the request dependency graph. FastAPI caches each
+# dependency per request, so every route and auth check that asks for
+# `get_db` shares one AsyncSession (and at most one pooled connection).
+from typing import Optional
+from fastapi import Depends, HTTPException, Query, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from jose import JWTError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db
 from models.user import User
-import os
-from models.user import User
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
-
-SECRET_KEY = os.getenv("SECRET_KEY", "defaultsecret")
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
+from utils.principal_cache import principal_cache
+from utils.tokens import ACCESS_TOKEN, decode_token, is_revoked
 
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+async def authenticate(token: str, db: AsyncSession, claims: Optional[dict] = None) -> User:
+    """Resolve a bearer JWT to its user or raise 401."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         email: str = payload.get("sub")
-        if email is None:
+        # reset tokens share the signing keys but must not act as bearer tokens
+        if email is None or payload.get("typ") != ACCESS_TOKEN:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+    if await is_revoked(db, payload):
+        raise credentials_exception
+    if claims is not None:
+        claims.update(payload)
 
-    user = db.query(User).filter(User.email == email).first()
+    user = principal_cache.get(email)
     if user is None:
+        user = await db.scalar(select(User).where(User.email == email))
+        if user is None:
+            raise credentials_exception
+        principal_cache.put(user)
+    if user.is_active is False:
         raise credentials_exception
     return user
 
-# utils/dependencies.py
 
-def get_current_admin(current_user: User = Depends(get_current_user)):
-    if current_user.role != "admin":
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admin can access this resource")
-    return current_user
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    return await authenticate(credentials.credentials, db)
+
+
+async def get_stream_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    token: Optional[str] = Query(None, description="JWT for clients that cannot set headers (EventSource)"),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    if credentials is None and token is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await authenticate(credentials.credentials if credentials else token, db)
+
 
 def RoleChecker(*roles):
-    def checker(current_user: User = Depends(get_current_user)):
+    async def checker(current_user: User = Depends(get_current_user)):
         if current_user.role not in roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not authorized",
             )
         return current_user
-    return checker
\ No newline at end of file
+    return checker
+
+
+async def get_current_patient(current_user: User = Depends(get_current_user)):
+    if current_user.role != "patient":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Patients only!")
+    return current_user
+
+
+async def get_current_doctor(current_user: User = Depends(get_current_user)):
+    if current_user.role != "doctor":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Doctors only!")
+    return current_user
+
+
+async def get_current_admin(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admins only!")
+    return current_user
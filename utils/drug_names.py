@@ -0,0 +1,15 @@
+# utils/drug_names.py
+import re
+import unicodedata
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_drug_name(name: str) -> str:
+    """
+    Matching key for drug names typed by doctors and admins.
+
+    Unicode-normalized, case-folded and whitespace-collapsed, so
+    "Paracetamol  500mg" and "paracetamol 500MG" compare equal.
+    """
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", name).casefold()).strip()
@@ -1,39 +1,149 @@
 # utils/email.py
+#
+# Emails are queued as EmailJob rows in the caller's transaction and sent by
+# email_worker.py through the transport named by EMAIL_TRANSPORT:
+#
+#     resend  Resend batch API (default)
+#     smtp    any SMTP server, e.g. a local sink: python -m aiosmtpd -n -l localhost:1025
+#     fake    kept in memory (FakeTransport.sent), for tests and local runs
 
+import html
 import os
+import smtplib
+from dataclasses import dataclass
+from email.message import EmailMessage
+from string import Template
+from typing import Dict, List, Optional
+
 import resend
 from dotenv import load_dotenv
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.email_job import EmailJob
 
 load_dotenv()
 
 resend.api_key = os.getenv("RESEND_API_KEY")
 RESET_LINK_BASE_URL = os.getenv("RESET_LINK_BASE_URL")  # e.g. https://yourfrontend.com/reset-password
 EMAIL_FROM = os.getenv("EMAIL_FROM")  # e.g. YourApp <noreply@yourdomain.com>
+EMAIL_TRANSPORT = os.getenv("EMAIL_TRANSPORT", "resend")
+SMTP_HOST = os.getenv("SMTP_HOST", "localhost")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 1025))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "false").lower() == "true"
+
+PASSWORD_RESET = "password_reset"
+
+
+@dataclass(frozen=True)
+class EmailTemplate:
+    subject: Template
+    html: Template
+
+    def render(self, context: Dict[str, str]) -> tuple:
+        escaped = {key: html.escape(str(value)) for key, value in context.items()}
+        return self.subject.substitute(context), self.html.substitute(escaped)
 
-def send_password_reset_email(to_email: str, token: str):
-    """
-    Sends a password reset email to the user using Resend.
-    """
-    reset_link = f"{RESET_LINK_BASE_URL}?token={token}"
 
-    html_content = f"""
+# Parsed once at import; rendering is a single substitution per message
+TEMPLATES = {
+    PASSWORD_RESET: EmailTemplate(
+        subject=Template("Reset Your Password"),
+        html=Template("""
     <div style="font-family:sans-serif">
         <h2>Password Reset Request</h2>
         <p>You requested to reset your password. Click the link below to reset it:</p>
-        <a href="{reset_link}" style="color:blue;">Reset Password</a>
+        <a href="$reset_link" style="color:blue;">Reset Password</a>
         <p>This link will expire in 15 minutes. If you didn't request this, you can ignore this email.</p>
     </div>
+    """),
+    ),
+}
+
+
+@dataclass
+class OutgoingEmail:
+    to: str
+    subject: str
+    html: str
+
+
+def render_email(template: str, to_email: str, context: Dict[str, str]) -> OutgoingEmail:
+    subject, body = TEMPLATES[template].render(context)
+    return OutgoingEmail(to=to_email, subject=subject, html=body)
+
+
+def queue_email(db: AsyncSession, to_email: str, template: str, **context):
+    """
+    Queue an email without committing: it is sent only if the caller's
+    transaction commits.
     """
+    if template not in TEMPLATES:
+        raise ValueError(f"Unknown email template: {template}")
+    db.add(EmailJob(template=template, to_email=to_email, context=context))
+
+
+def queue_password_reset_email(db: AsyncSession, to_email: str, token: str):
+    queue_email(db, to_email, PASSWORD_RESET, reset_link=f"{RESET_LINK_BASE_URL}?token={token}")
+
+
+class ResendTransport:
+    # Largest batch the Resend batch endpoint accepts
+    max_batch = 100
+
+    def send(self, messages: List[OutgoingEmail]) -> List[Optional[str]]:
+        """
+        Send a batch. Returns one error message (or None) per email; an
+        exception fails the whole batch.
+        """
+        resend.Batch.send([
+            {"from": EMAIL_FROM, "to": [message.to], "subject": message.subject, "html": message.html}
+            for message in messages
+        ])
+        return [None] * len(messages)
+
+
+class SMTPTransport:
+    max_batch = 100
+
+    def send(self, messages: List[OutgoingEmail]) -> List[Optional[str]]:
+        """Send a batch over one SMTP connection; rejected recipients fail individually."""
+        errors = []
+        with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30) as smtp:
+            if SMTP_STARTTLS:
+                smtp.starttls()
+            if SMTP_USERNAME:
+                smtp.login(SMTP_USERNAME, SMTP_PASSWORD)
+            for message in messages:
+                email = EmailMessage()
+                email["From"] = EMAIL_FROM
+                email["To"] = message.to
+                email["Subject"] = message.subject
+                email.set_content(message.html, subtype="html")
+                try:
+                    smtp.send_message(email)
+                    errors.append(None)
+                except smtplib.SMTPException as e:
+                    errors.append(str(e))
+        return errors
+
+
+class FakeTransport:
+    max_batch = 100
+
+    def __init__(self):
+        self.sent: List[OutgoingEmail] = []
+
+    def send(self, messages: List[OutgoingEmail]) -> List[Optional[str]]:
+        self.sent.extend(messages)
+        return [None] * len(messages)
+
+
+TRANSPORTS = {"resend": ResendTransport, "smtp": SMTPTransport, "fake": FakeTransport}
+
 
-    try:
-        
-        resend.Emails.send({
-            "from": EMAIL_FROM,
-            "to": [to_email],
-            "subject": "Reset Your Password",
-            "html": html_content
-        })
-        print(f"Reset email sent to {to_email}")
-    except Exception as e:
-        print(f"Failed to send reset email: {e}")
-        raise
+def get_transport(name: str = EMAIL_TRANSPORT):
+    if name not in TRANSPORTS:
+        raise ValueError(f"Unknown EMAIL_TRANSPORT: {name}")
+    return TRANSPORTS[name]()
@@ -0,0 +1,36 @@
+# utils/fast_json.py
+#
+# Fast path for large list responses: select only the columns a response
+# schema declares, as plain tuples, and encode them with orjson instead of
+# building ORM objects and validating each one with Pydantic. The schema
+# stays the source of truth for the shape; routes keep it as response_model
+# for the OpenAPI docs.
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+from utils.pagination import NEXT_CURSOR_HEADER
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        # naive datetimes come out as ISO 8601 without an offset, same as Pydantic
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def schema_columns(model, schema: type[BaseModel], **overrides) -> list:
+    """
+    One labelled column per field of `schema`, taken from `model` unless
+    given in `overrides` (for fields that are not plain column attributes).
+    """
+    return [overrides.get(name, getattr(model, name)).label(name) for name in schema.model_fields]
+
+
+def rows_response(rows, response: Response = None) -> FastJSONResponse:
+    """Encode rows selected with schema_columns(), keeping the pagination cursor header."""
+    headers = None
+    if response is not None and NEXT_CURSOR_HEADER in response.headers:
+        headers = {NEXT_CURSOR_HEADER: response.headers[NEXT_CURSOR_HEADER]}
+    return FastJSONResponse([row._asdict() for row in rows], headers=headers)
@@ -1,6 +1,112 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 
+from utils.metrics import Counter, Gauge, Histogram
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+# bcrypt releases the GIL, so a small dedicated pool keeps hashing off the
+# request threadpool while still using every core.
+HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", os.cpu_count() or 2))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", 32))
+
+
+def _parse_queue_limits(raw: str) -> dict:
+    # e.g. HASH_QUEUE_LIMITS="login=64,register=16"
+    limits = {}
+    for item in raw.split(","):
+        if "=" in item:
+            endpoint, limit = item.split("=", 1)
+            limits[endpoint.strip()] = int(limit)
+    return limits
+
+
+HASH_QUEUE_LIMITS = _parse_queue_limits(os.getenv("HASH_QUEUE_LIMITS", ""))
+
+_executor = ThreadPoolExecutor(max_workers=HASH_POOL_SIZE, thread_name_prefix="bcrypt")
+_pending = {}
+_pending_lock = threading.Lock()
+
+hash_queue_depth = Gauge(
+    "password_hash_queue_depth",
+    "Password hash jobs waiting or running, per endpoint",
+    ["endpoint"],
+)
+hash_wait_seconds = Histogram(
+    "password_hash_wait_seconds",
+    "Time a password hash job waited for a worker",
+    ["endpoint"],
+)
+hash_duration_seconds = Histogram(
+    "password_hash_duration_seconds",
+    "Time spent computing a password hash or verification",
+    ["endpoint", "operation"],
+)
+hash_rejected_total = Counter(
+    "password_hash_rejected_total",
+    "Password hash jobs rejected because the endpoint queue was full",
+    ["endpoint"],
+)
+
+
+def _admit(endpoint: str):
+    limit = HASH_QUEUE_LIMITS.get(endpoint, HASH_QUEUE_LIMIT)
+    with _pending_lock:
+        if _pending.get(endpoint, 0) >= limit:
+            hash_rejected_total.inc(endpoint=endpoint)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Server is busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        _pending[endpoint] = _pending.get(endpoint, 0) + 1
+    hash_queue_depth.inc(endpoint=endpoint)
+
+
+def _release(endpoint: str):
+    with _pending_lock:
+        _pending[endpoint] -= 1
+    hash_queue_depth.dec(endpoint=endpoint)
+
+
+def _timed(endpoint, operation, submitted_at, fn, *args):
+    started_at = time.perf_counter()
+    hash_wait_seconds.observe(started_at - submitted_at, endpoint=endpoint)
+    try:
+        return fn(*args)
+    finally:
+        hash_duration_seconds.observe(time.perf_counter() - started_at, endpoint=endpoint, operation=operation)
+
+
+def _submit(endpoint: str, operation: str, fn, *args):
+    _admit(endpoint)
+    try:
+        future = _executor.submit(_timed, endpoint, operation, time.perf_counter(), fn, *args)
+    except BaseException:
+        _release(endpoint)
+        raise
+    future.add_done_callback(lambda _: _release(endpoint))
+    return future
+
+
+def get_password_hash(password: str, endpoint: str = "default") -> str:
+    return _submit(endpoint, "hash", pwd_context.hash, password).result()
+
+
+def verify_password(plain_password: str, hashed_password: str, endpoint: str = "default") -> bool:
+    return _submit(endpoint, "verify", pwd_context.verify, plain_password, hashed_password).result()
+
+
+# Async handlers await the pool instead of blocking an event-loop thread.
+async def get_password_hash_async(password: str, endpoint: str = "default") -> str:
+    return await asyncio.wrap_future(_submit(endpoint, "hash", pwd_context.hash, password))
+
+
+async def verify_password_async(plain_password: str, hashed_password: str, endpoint: str = "default") -> bool:
+    return await asyncio.wrap_future(_submit(endpoint, "verify", pwd_context.verify, plain_password, hashed_password))
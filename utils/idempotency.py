@@ -0,0 +1,71 @@
+# utils/idempotency.py
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.idempotency_key import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+# Retries after this are new requests; prune_idempotency_keys.py removes older rows
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", 24))
+
+
+def request_hash(payload) -> str:
+    body = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+async def get_stored_response(
+    db: AsyncSession, user_id: int, key: str, endpoint: str, fingerprint: str
+) -> Optional[JSONResponse]:
+    """The original response for (user, key), or None if the key is new or expired."""
+    record = await db.scalar(select(IdempotencyKey).where(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key,
+    ))
+    if record is None:
+        return None
+    if record.created_at < datetime.utcnow() - timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS):
+        # Free the key for this request; the delete commits with its response
+        await db.delete(record)
+        await db.flush()
+        return None
+    if record.endpoint != endpoint or record.request_hash != fingerprint:
+        raise HTTPException(
+            status_code=422,
+            detail=f"{IDEMPOTENCY_HEADER} was already used for a different request",
+        )
+    return JSONResponse(
+        status_code=record.status_code,
+        content=json.loads(record.response_body),
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+def store_response(
+    db: AsyncSession, user_id: int, key: str, endpoint: str, fingerprint: str, status_code: int, body
+) -> None:
+    """
+    Stage the response in the caller's transaction.
+
+    Committing it together with the resource it describes means a retry
+    either sees both or neither; a concurrent retry with the same key
+    fails on the (user_id, key) unique constraint instead.
+    """
+    db.add(IdempotencyKey(
+        user_id=user_id,
+        key=key,
+        endpoint=endpoint,
+        request_hash=fingerprint,
+        status_code=status_code,
+        response_body=json.dumps(jsonable_encoder(body)),
+    ))
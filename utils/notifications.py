@@ -1,8 +1,88 @@
 # utils/notifications.py
+from typing import Dict, Iterable
+
+from sqlalchemy import case, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from models.notification import Notification
-from sqlalchemy.orm import Session
+from models.notification_counter import NotificationCounter
+from models.notification_outbox import NotificationOutbox
+from schemas.notification import NotificationOut
+
+# Set on the session so the dispatcher is woken up once the transaction commits
+OUTBOX_PENDING = "notification_outbox_pending"
+
+
+def notify_users(db: AsyncSession, user_ids: Iterable[int], message: str):
+    """
+    Queue one notification for several users.
+
+    Nothing is committed here: the event is stored in the caller's
+    transaction and delivered by services.notification_dispatcher.
+    """
+    db.add(NotificationOutbox(recipient_ids=list(user_ids), message=message))
+    db.info[OUTBOX_PENDING] = True
+
+
+def create_notification(db: AsyncSession, user_id: int, message: str):
+    notify_users(db, [user_id], message)
+
+
+def notification_channel(user_id: int) -> str:
+    return f"notifications:{user_id}"
+
+
+def serialize_notification(notification: Notification) -> str:
+    return NotificationOut.model_validate(notification).model_dump_json()
+
+
+async def get_unread_count(db: AsyncSession, user_id: int) -> int:
+    counter = await db.get(NotificationCounter, user_id)
+    return counter.unread_count if counter else 0
+
+
+async def increment_unread(db: AsyncSession, counts: Dict[int, int]):
+    """Add `counts[user_id]` to each user's unread counter in one upsert."""
+    if not counts:
+        return
+    # sorted so concurrent dispatchers lock counter rows in the same order
+    values = [{"user_id": user_id, "unread_count": n} for user_id, n in sorted(counts.items())]
+    dialect = db.bind.dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(NotificationCounter).values(values)
+        stmt = stmt.on_duplicate_key_update(
+            unread_count=NotificationCounter.unread_count + stmt.inserted.unread_count
+        )
+    else:
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(NotificationCounter).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[NotificationCounter.user_id],
+            set_={"unread_count": NotificationCounter.unread_count + stmt.excluded.unread_count},
+        )
+    await db.execute(stmt)
+
 
-def create_notification(db: Session, user_id: int, message: str):
-    notification = Notification(user_id=user_id, message=message)
-    db.add(notification)
-    db.commit()
+async def mark_read(db: AsyncSession, user_id: int, *conditions) -> int:
+    """
+    Mark the user's unread notifications matching `conditions` as read and
+    lower their counter by the same amount, without committing.
+    Returns the number of notifications marked.
+    """
+    result = await db.execute(
+        update(Notification)
+        .where(Notification.user_id == user_id, Notification.is_read == 0, *conditions)
+        .values(is_read=1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        await db.execute(
+            update(NotificationCounter)
+            .where(NotificationCounter.user_id == user_id)
+            .values(unread_count=case(
+                (NotificationCounter.unread_count > result.rowcount, NotificationCounter.unread_count - result.rowcount),
+                else_=0,
+            ))
+        )
+    return result.rowcount
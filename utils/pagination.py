@@ -0,0 +1,95 @@
+# utils/pagination.py
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", 50))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 200))
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+
+class DateRange:
+    def __init__(
+        self,
+        date_from: Optional[datetime] = Query(None, alias="from"),
+        date_to: Optional[datetime] = Query(None, alias="to"),
+    ):
+        self.date_from = date_from
+        self.date_to = date_to
+
+    def apply(self, query, column):
+        if self.date_from is not None:
+            query = query.where(column >= self.date_from)
+        if self.date_to is not None:
+            query = query.where(column < self.date_to)
+        return query
+
+
+def encode_cursor(values) -> str:
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        if len(payload) != len(columns):
+            raise ValueError("cursor does not match this listing")
+        return [
+            datetime.fromisoformat(value) if column.type.python_type is datetime else value
+            for column, value in zip(columns, payload)
+        ]
+    except (ValueError, TypeError, NotImplementedError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def paginate(
+    db: AsyncSession,
+    query,
+    keys,
+    page: PageParams,
+    response: Response,
+    descending: bool = False,
+):
+    """
+    Keyset-paginate a select() over `keys`, e.g. (Model.created_at, Model.id).
+
+    The last key must be unique. Returns at most `page.limit` rows and sets
+    the X-Next-Cursor response header when more rows are available. ORM
+    entities are returned as objects; column selects come back as Rows,
+    which must include every key under its own name.
+    """
+    if page.cursor:
+        values = decode_cursor(page.cursor, keys)
+        row_key = tuple_(*keys) if len(keys) > 1 else keys[0]
+        bound = tuple_(*values) if len(keys) > 1 else values[0]
+        query = query.where(row_key < bound if descending else row_key > bound)
+
+    order = [key.desc() for key in keys] if descending else list(keys)
+    result = await db.execute(query.order_by(*order).limit(page.limit + 1))
+    is_entity = query.column_descriptions[0]["entity"] is query.column_descriptions[0]["expr"]
+    rows = (result.scalars() if is_entity else result).all()
+
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([getattr(last, key.key) for key in keys])
+    return rows
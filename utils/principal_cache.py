@@ -0,0 +1,106 @@
+# utils/principal_cache.py
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from models.user import User
+
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 60))
+PRINCIPAL_CACHE_MAX_SIZE = int(os.getenv("PRINCIPAL_CACHE_MAX_SIZE", 10000))
+
+# Set on the session; the subjects are dropped from the cache after commit
+PENDING_INVALIDATIONS = "pending_principal_invalidations"
+
+# Columns copied into the cache; relationships are never cached.
+_USER_COLUMNS = [column.key for column in inspect(User).column_attrs]
+
+
+class PrincipalCache:
+    """
+    TTL + LRU cache of authenticated users keyed by token subject (email).
+
+    Entries are plain column snapshots, so a hit never touches the session
+    that served the original lookup.
+    """
+
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, subject: str) -> User | None:
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None:
+                return None
+            expires_at, values = entry
+            if expires_at <= time.monotonic():
+                del self._entries[subject]
+                return None
+            self._entries.move_to_end(subject)
+
+        user = User(**values)
+        make_transient_to_detached(user)
+        return user
+
+    def put(self, user: User) -> None:
+        if self.max_size <= 0:
+            return
+        values = {key: getattr(user, key) for key in _USER_COLUMNS}
+        with self._lock:
+            self._entries[user.email] = (time.monotonic() + self.ttl_seconds, values)
+            self._entries.move_to_end(user.email)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, subject: str) -> None:
+        with self._lock:
+            self._entries.pop(subject, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_MAX_SIZE)
+
+
+def _invalidate_after_commit(target: User, *subjects: str):
+    session = object_session(target)
+    if session is None:
+        for subject in subjects:
+            principal_cache.invalidate(subject)
+        return
+    session.info.setdefault(PENDING_INVALIDATIONS, set()).update(subjects)
+
+
+# Any flushed change to a user (role, is_active, password, email) drops the
+# cached principal, so explicit invalidation is only needed for bulk updates.
+# It happens after commit: dropped at flush, a concurrent request could
+# re-cache the old row before the change is visible, for a whole TTL.
+@event.listens_for(User, "after_update")
+def _invalidate_updated_user(mapper, connection, target):
+    _invalidate_after_commit(target, target.email, *inspect(target).attrs.email.history.deleted)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target):
+    _invalidate_after_commit(target, target.email)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_invalidations(session):
+    for subject in session.info.pop(PENDING_INVALIDATIONS, ()):
+        principal_cache.invalidate(subject)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_invalidations(session):
+    session.info.pop(PENDING_INVALIDATIONS, None)
@@ -0,0 +1,165 @@
+# utils/pubsub.py
+#
+# In-process pub/sub hub. Subscribers are asyncio queues owned by this
+# process; the backend decides how a published message reaches every
+# process' hub. The in-memory backend only reaches this process, the
+# Redis backend reaches all uvicorn workers pointed at the same server.
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Callable
+
+PUBSUB_URL = os.getenv("PUBSUB_URL")  # e.g. redis://localhost:6379/0; in-memory when unset
+PUBSUB_CHANNEL_PREFIX = os.getenv("PUBSUB_CHANNEL_PREFIX", "smart-health:")
+# Messages buffered per subscriber before it is dropped as too slow
+PUBSUB_QUEUE_SIZE = int(os.getenv("PUBSUB_QUEUE_SIZE", 100))
+# Backoff between attempts to re-subscribe after the Redis connection drops
+PUBSUB_RECONNECT_MIN_SECONDS = float(os.getenv("PUBSUB_RECONNECT_MIN_SECONDS", 0.5))
+PUBSUB_RECONNECT_MAX_SECONDS = float(os.getenv("PUBSUB_RECONNECT_MAX_SECONDS", 30))
+
+logger = logging.getLogger(__name__)
+
+Deliver = Callable[[str, str], None]
+Resync = Callable[[], None]
+
+
+class SubscriberLagging(Exception):
+    """The subscriber fell behind and missed messages."""
+
+
+class InMemoryBackend:
+    def __init__(self):
+        self._deliver: Deliver = None
+
+    async def start(self, deliver: Deliver, resync: Resync):
+        self._deliver = deliver
+
+    async def publish(self, channel: str, message: str):
+        self._deliver(channel, message)
+
+    async def close(self):
+        pass
+
+
+class RedisBackend:
+    def __init__(self, url: str, prefix: str = PUBSUB_CHANNEL_PREFIX):
+        import redis.asyncio as redis  # optional dependency, only needed with PUBSUB_URL
+
+        self._redis = redis.from_url(url, decode_responses=True)
+        self._prefix = prefix
+        self._reader: asyncio.Task = None
+
+    async def start(self, deliver: Deliver, resync: Resync):
+        pubsub = await self._subscribe()
+        self._reader = asyncio.create_task(self._read(pubsub, deliver, resync))
+
+    async def _subscribe(self):
+        pubsub = self._redis.pubsub()
+        await pubsub.psubscribe(f"{self._prefix}*")
+        return pubsub
+
+    async def _read(self, pubsub, deliver: Deliver, resync: Resync):
+        """Deliver messages until cancelled, re-subscribing with backoff when the connection drops."""
+        delay = PUBSUB_RECONNECT_MIN_SECONDS
+        while True:
+            try:
+                if pubsub is None:
+                    pubsub = await self._subscribe()
+                    logger.warning("Re-subscribed to Redis pub/sub")
+                    # Messages published meanwhile are lost; subscribers catch up from the database
+                    resync()
+                async for item in pubsub.listen():
+                    delay = PUBSUB_RECONNECT_MIN_SECONDS  # the connection works again
+                    if item["type"] == "pmessage":
+                        deliver(item["channel"][len(self._prefix):], item["data"])
+                logger.warning("Redis pub/sub stream ended; re-subscribing in %.1fs", delay)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Redis pub/sub reader failed; re-subscribing in %.1fs", delay)
+
+            if pubsub is not None:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass  # the connection is already gone
+                pubsub = None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, PUBSUB_RECONNECT_MAX_SECONDS)
+
+    async def publish(self, channel: str, message: str):
+        await self._redis.publish(f"{self._prefix}{channel}", message)
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+        await self._redis.aclose()
+
+
+class Subscription:
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=PUBSUB_QUEUE_SIZE)
+        self.lagging = False
+
+    async def get(self, timeout: float = None) -> str:
+        """Next message, or None after `timeout` seconds without one."""
+        if self.lagging and self.queue.empty():
+            raise SubscriberLagging()
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Hub:
+    def __init__(self, backend):
+        self.backend = backend
+        self._subscriptions: dict[str, set[Subscription]] = defaultdict(set)
+        self._started = False
+        self._lock = asyncio.Lock()
+
+    async def _ensure_started(self):
+        async with self._lock:
+            if not self._started:
+                await self.backend.start(self._deliver, self._resync)
+                self._started = True
+
+    def _deliver(self, channel: str, message: str):
+        for subscription in self._subscriptions.get(channel, ()):
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                subscription.lagging = True
+
+    def _resync(self):
+        # Same as overflowing the queue: the stream ends and the client
+        # reconnects with Last-Event-ID, replaying what it missed
+        for subscriptions in self._subscriptions.values():
+            for subscription in subscriptions:
+                subscription.lagging = True
+
+    async def publish(self, channel: str, message: str):
+        await self._ensure_started()
+        await self.backend.publish(channel, message)
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str):
+        await self._ensure_started()
+        subscription = Subscription()
+        self._subscriptions[channel].add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._subscriptions[channel].discard(subscription)
+            if not self._subscriptions[channel]:
+                del self._subscriptions[channel]
+
+    async def close(self):
+        if self._started:
+            await self.backend.close()
+            self._started = False
+
+
+hub = Hub(RedisBackend(PUBSUB_URL) if PUBSUB_URL else InMemoryBackend())
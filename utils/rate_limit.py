@@ -0,0 +1,216 @@
+# utils/rate_limit.py
+#
+# Token-bucket rate limits for the /api/auth endpoints. Limits are
+# "capacity/seconds": a client may burst `capacity` requests, and the bucket
+# refills at capacity/seconds per second. Three kinds of bucket are kept:
+#
+#     per client IP    checked by AuthRateLimitMiddleware for every request
+#     per account      checked in the handlers once the email is parsed
+#     failed logins    per account, spent only by wrong passwords; once
+#                      empty, logins are rejected before any password hash
+#
+# Buckets live in this process unless RATE_LIMIT_URL points at Redis, in
+# which case every worker shares them.
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from utils.metrics import Counter, Gauge
+
+RATE_LIMIT_URL = os.getenv("RATE_LIMIT_URL")  # e.g. redis://localhost:6379/1; in-memory when unset
+RATE_LIMIT_PREFIX = os.getenv("RATE_LIMIT_PREFIX", "smart-health:ratelimit:")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000))
+# Use the first X-Forwarded-For address; only enable behind a proxy that sets it
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+
+AUTH_PREFIX = "/api/auth/"
+
+
+def _parse_limits(raw: str) -> Dict[str, Tuple[int, float]]:
+    # e.g. "login=20/60,register=5/600"
+    limits = {}
+    for item in raw.split(","):
+        if "=" in item:
+            route, limit = item.split("=", 1)
+            capacity, seconds = limit.split("/", 1)
+            limits[route.strip()] = (int(capacity), float(seconds))
+    return limits
+
+
+IP_LIMITS = _parse_limits(os.getenv(
+    "RATE_LIMITS_PER_IP",
+    "login=20/60,register=5/600,forgot-password=5/600,request-password-reset=5/600",
+))
+ACCOUNT_LIMITS = _parse_limits(os.getenv(
+    "RATE_LIMITS_PER_ACCOUNT",
+    "login=10/60,forgot-password=3/600,request-password-reset=3/600",
+))
+LOGIN_FAILURE_LIMIT = _parse_limits(f"login={os.getenv('LOGIN_FAILURE_LIMIT', '5/900')}")["login"]
+
+rate_limit_requests_total = Counter(
+    "rate_limit_requests_total",
+    "Requests checked against a rate limit, by outcome (allowed or limited)",
+    ["route", "scope", "outcome"],
+)
+rate_limit_capacity = Gauge(
+    "rate_limit_capacity",
+    "Configured bucket size per route and scope",
+    ["route", "scope"],
+)
+rate_limit_period_seconds = Gauge(
+    "rate_limit_period_seconds",
+    "Seconds for an empty bucket to refill, per route and scope",
+    ["route", "scope"],
+)
+
+for _scope, _limits in (("ip", IP_LIMITS), ("account", ACCOUNT_LIMITS), ("login_failures", {"login": LOGIN_FAILURE_LIMIT})):
+    for _route, (_capacity, _seconds) in _limits.items():
+        rate_limit_capacity.set(_capacity, route=_route, scope=_scope)
+        rate_limit_period_seconds.set(_seconds, route=_route, scope=_scope)
+
+
+class InMemoryStore:
+    """Buckets of this process, least recently used dropped beyond max_keys."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, capacity: int, rate: float, cost: float) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, tokens
+
+    async def reset(self, key: str):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+# Refill, then spend ARGV[4] tokens if available; one round trip, atomic
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisStore:
+    """Buckets shared by every worker using the same Redis server."""
+
+    def __init__(self, url: str, prefix: str = RATE_LIMIT_PREFIX):
+        import redis.asyncio as redis  # optional dependency, only needed with RATE_LIMIT_URL
+
+        self._redis = redis.from_url(url, decode_responses=True)
+        self._prefix = prefix
+        self._take = self._redis.register_script(_TAKE_SCRIPT)
+
+    async def take(self, key: str, capacity: int, rate: float, cost: float) -> Tuple[bool, float]:
+        allowed, tokens = await self._take(keys=[self._prefix + key], args=[capacity, rate, time.time(), cost])
+        return bool(allowed), float(tokens)
+
+    async def reset(self, key: str):
+        await self._redis.delete(self._prefix + key)
+
+
+store = RedisStore(RATE_LIMIT_URL) if RATE_LIMIT_URL else InMemoryStore()
+
+
+def _too_many_requests(retry_after: float, detail: str = "Too many requests, please retry later") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+    )
+
+
+async def hit(scope: str, route: str, key: str, limit: Tuple[int, float], cost: float = 1) -> Optional[HTTPException]:
+    """Spend `cost` tokens from a bucket; returns the 429 to raise when it is empty."""
+    capacity, seconds = limit
+    rate = capacity / seconds
+    allowed, tokens = await store.take(f"{scope}:{route}:{key}", capacity, rate, cost)
+    rate_limit_requests_total.inc(route=route, scope=scope, outcome="allowed" if allowed else "limited")
+    if allowed:
+        return None
+    return _too_many_requests((cost - tokens) / rate)
+
+
+def client_ip(request: Request) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+class AuthRateLimitMiddleware(BaseHTTPMiddleware):
+    """Per-IP buckets for the routes listed in RATE_LIMITS_PER_IP."""
+
+    async def dispatch(self, request: Request, call_next):
+        route = request.url.path[len(AUTH_PREFIX):] if request.url.path.startswith(AUTH_PREFIX) else None
+        if route in IP_LIMITS and request.method == "POST":
+            limited = await hit("ip", route, client_ip(request), IP_LIMITS[route])
+            if limited is not None:
+                return JSONResponse(status_code=limited.status_code, content={"error": limited.detail},
+                                    headers=limited.headers)
+        return await call_next(request)
+
+
+async def check_account_limit(route: str, email: str):
+    """Raise 429 when `email` has used up its bucket for `route`."""
+    if route in ACCOUNT_LIMITS:
+        limited = await hit("account", route, email.strip().lower(), ACCOUNT_LIMITS[route])
+        if limited is not None:
+            raise limited
+
+
+def _failure_key(email: str) -> str:
+    return f"login_failures:login:{email.strip().lower()}"
+
+
+async def check_login_failures(email: str):
+    """Raise 429 while the account has too many recent failed logins. Spends nothing."""
+    capacity, seconds = LOGIN_FAILURE_LIMIT
+    rate = capacity / seconds
+    _, tokens = await store.take(_failure_key(email), capacity, rate, 0)
+    allowed = tokens >= 1
+    rate_limit_requests_total.inc(route="login", scope="login_failures", outcome="allowed" if allowed else "limited")
+    if not allowed:
+        raise _too_many_requests((1 - tokens) / rate, "Too many failed login attempts, please retry later")
+
+
+async def record_login_failure(email: str):
+    capacity, seconds = LOGIN_FAILURE_LIMIT
+    await store.take(_failure_key(email), capacity, capacity / seconds, 1)
+
+
+async def clear_login_failures(email: str):
+    await store.reset(_failure_key(email))
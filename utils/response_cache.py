@@ -0,0 +1,122 @@
+# utils/response_cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models.user import User
+
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 30))
+RESPONSE_CACHE_MAX_SIZE = int(os.getenv("RESPONSE_CACHE_MAX_SIZE", 256))
+
+# Set on the session when a flushed user change is waiting for commit
+PENDING_DIRECTORY_INVALIDATION = "pending_user_directory_invalidation"
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison, so W/"x" matches "x"
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """
+    TTL + LRU cache of serialized JSON responses with a version counter.
+
+    invalidate() bumps the version and drops every entry. ETags combine the
+    version with a digest of the body, so they stay strong validators even
+    when another worker refilled its own cache from newer rows.
+    """
+
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.version = 0
+        self._entries: "OrderedDict[Hashable, tuple[float, bytes, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def _put(self, key: Hashable, version: int, body: bytes, etag: str) -> None:
+        with self._lock:
+            # Skip results loaded while an invalidation happened
+            if version != self.version or self.max_size <= 0:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    async def respond(self, request: Request, key: Hashable, load: Callable[[], Awaitable]) -> Response:
+        """
+        Serve `key` from the cache, calling `load()` for the payload on a miss.
+        A matching If-None-Match gets a 304 without calling `load()`.
+        """
+        cached = self._get(key)
+        if cached is None:
+            version = self.version
+            body = json.dumps(jsonable_encoder(await load()), separators=(",", ":")).encode()
+            etag = f'"{version}-{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+            self._put(key, version, body, etag)
+        else:
+            body, etag = cached
+
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Doctor and patient directories, all derived from the users table
+user_directory_cache = ResponseCache(RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_MAX_SIZE)
+
+
+# Any flushed user change invalidates the directories once it commits.
+# Invalidated at flush, a concurrent request could re-cache the old rows
+# before the change is visible, and a rollback would still bump the version.
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user_directories(mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        user_directory_cache.invalidate()
+        return
+    session.info[PENDING_DIRECTORY_INVALIDATION] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_invalidation(session):
+    if session.info.pop(PENDING_DIRECTORY_INVALIDATION, False):
+        user_directory_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_invalidation(session):
+    session.info.pop(PENDING_DIRECTORY_INVALIDATION, None)
@@ -0,0 +1,212 @@
+# utils/tokens.py
+#
+# JWT signing keys and revocation.
+#
+# Keys come from JWT_KEYS, e.g. "2026a:first-secret,2026b:second-secret:2026-07-01".
+# Each entry is kid:secret[:activates_at]. The most recently activated key
+# signs new tokens and every configured key verifies, so a rotation is:
+# add the next key with a future activation date, and drop the old one once
+# the tokens it signed have expired. Without JWT_KEYS, SECRET_KEY is the
+# only key (kid "default"), which also verifies tokens issued without a kid.
+#
+# Revoked tokens are checked without a query: each worker keeps a bloom
+# filter of revoked jtis and an exact map of subjects revoked in bulk
+# (password reset, deactivation), reloaded every
+# TOKEN_REVOCATION_REFRESH_SECONDS. Only a bloom hit, i.e. a revoked token
+# or a rare false positive, is confirmed against the database.
+import hashlib
+import math
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+
+from jose import JWTError, jwt
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models.token_revocation import TokenRevocation
+
+SECRET_KEY = os.getenv("SECRET_KEY", "defaultsecret")
+ALGORITHM = os.getenv("ALGORITHM", "HS256")
+JWT_KEYS = os.getenv("JWT_KEYS", "")
+# Longest lifetime of any token; bulk revocations are kept this long
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
+TOKEN_REVOCATION_REFRESH_SECONDS = float(os.getenv("TOKEN_REVOCATION_REFRESH_SECONDS", 30))
+TOKEN_REVOCATION_FALSE_POSITIVE_RATE = float(os.getenv("TOKEN_REVOCATION_FALSE_POSITIVE_RATE", 0.001))
+
+DEFAULT_KID = "default"
+
+# Set on the session; applied to this worker's revocation list after commit
+PENDING_REVOCATIONS = "pending_token_revocations"
+
+
+class Keyring:
+    def __init__(self, spec: str, fallback_secret: str):
+        self.keys: Dict[str, tuple] = {}  # kid -> (secret, activates_at)
+        for entry in filter(None, (part.strip() for part in spec.split(","))):
+            kid, secret, *activates = entry.split(":", 2)
+            activates_at = datetime.fromisoformat(activates[0]) if activates else datetime.min
+            self.keys[kid] = (secret, activates_at)
+        if not self.keys:
+            self.keys[DEFAULT_KID] = (fallback_secret, datetime.min)
+
+    def signing_key(self) -> tuple:
+        """(kid, secret) of the most recently activated key."""
+        now = datetime.utcnow()
+        active = [(activates_at, kid) for kid, (_, activates_at) in self.keys.items() if activates_at <= now]
+        if not active:
+            raise RuntimeError("No JWT signing key is active yet; check JWT_KEYS")
+        _, kid = max(active)
+        return kid, self.keys[kid][0]
+
+    def verification_key(self, kid: Optional[str]) -> str:
+        entry = self.keys.get(kid or DEFAULT_KID)
+        if entry is None:
+            raise JWTError("Unknown signing key")
+        return entry[0]
+
+
+keyring = Keyring(JWT_KEYS, SECRET_KEY)
+
+# `typ` claim values; each endpoint accepts only its own kind of token
+ACCESS_TOKEN = "access"
+RESET_TOKEN = "reset"
+
+
+def encode_token(claims: dict, expires_delta: timedelta) -> str:
+    """Sign `claims` with the current key, adding exp, iat and a unique jti."""
+    kid, secret = keyring.signing_key()
+    now = time.time()
+    payload = {**claims, "iat": now, "exp": int(now + expires_delta.total_seconds()), "jti": uuid.uuid4().hex}
+    return jwt.encode(payload, secret, algorithm=ALGORITHM, headers={"kid": kid})
+
+
+def decode_token(token: str) -> dict:
+    """Verify signature and expiry; raises JWTError. Revocation is checked separately."""
+    kid = jwt.get_unverified_header(token).get("kid")
+    return jwt.decode(token, keyring.verification_key(kid), algorithms=[ALGORITHM])
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, false_positive_rate: float):
+        capacity = max(capacity, 1024)
+        self.size = max(8, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        # Double hashing: two 64-bit halves of one digest give every probe
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    def __init__(self, refresh_seconds: float, false_positive_rate: float):
+        self.refresh_seconds = refresh_seconds
+        self.false_positive_rate = false_positive_rate
+        self.jtis = BloomFilter(0, false_positive_rate)
+        self.subjects: Dict[str, float] = {}  # subject -> revoked_at (epoch seconds)
+        self.loaded_at: Optional[float] = None
+
+    def is_stale(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at >= self.refresh_seconds
+
+    def invalidate(self):
+        self.loaded_at = None
+
+    def rebuild(self, jtis: Iterable[str], subjects: Dict[str, float]):
+        jtis = list(jtis)
+        bloom = BloomFilter(2 * len(jtis), self.false_positive_rate)  # headroom for local revocations
+        for jti in jtis:
+            bloom.add(jti)
+        self.jtis, self.subjects = bloom, subjects
+        self.loaded_at = time.monotonic()
+
+    def add_jti(self, jti: str):
+        self.jtis.add(jti)
+
+    def add_subject(self, subject: str, revoked_at: float):
+        self.subjects[subject] = max(revoked_at, self.subjects.get(subject, 0.0))
+
+    def subject_revoked(self, claims: dict) -> bool:
+        revoked_at = self.subjects.get(claims.get("sub"))
+        # tokens issued before iat existed count as issued at the epoch
+        return revoked_at is not None and claims.get("iat", 0) < revoked_at
+
+    def might_be_revoked(self, claims: dict) -> bool:
+        jti = claims.get("jti")
+        return jti is not None and jti in self.jtis
+
+
+revocation_list = RevocationList(TOKEN_REVOCATION_REFRESH_SECONDS, TOKEN_REVOCATION_FALSE_POSITIVE_RATE)
+
+
+def _epoch(value: datetime) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+async def refresh_revocations(db: AsyncSession, force: bool = False):
+    if force or revocation_list.is_stale():
+        rows = (await db.execute(
+            select(TokenRevocation.jti, TokenRevocation.subject, TokenRevocation.revoked_at)
+            .where(TokenRevocation.expires_at > datetime.utcnow())
+        )).all()
+        subjects = {}
+        for row in rows:
+            if row.subject is not None:
+                subjects[row.subject] = max(_epoch(row.revoked_at), subjects.get(row.subject, 0.0))
+        revocation_list.rebuild((row.jti for row in rows if row.jti is not None), subjects)
+
+
+async def is_revoked(db: AsyncSession, claims: dict) -> bool:
+    await refresh_revocations(db)
+    if revocation_list.subject_revoked(claims):
+        return True
+    if not revocation_list.might_be_revoked(claims):
+        return False
+    return await db.scalar(
+        select(TokenRevocation.id).where(TokenRevocation.jti == claims["jti"]).limit(1)
+    ) is not None
+
+
+def revoke_token(db: AsyncSession, claims: dict):
+    """Revoke one token (logout). Staged in the caller's transaction."""
+    if claims.get("jti") is None:
+        return
+    expires_at = datetime.utcfromtimestamp(claims["exp"])
+    db.add(TokenRevocation(jti=claims["jti"], expires_at=expires_at))
+    db.info.setdefault(PENDING_REVOCATIONS, []).append(("jti", claims["jti"], None))
+
+
+def revoke_subject(db: AsyncSession, subject: str):
+    """Revoke every token of `subject` issued until now (password reset, deactivation)."""
+    now = datetime.utcnow()
+    db.add(TokenRevocation(subject=subject, revoked_at=now,
+                           expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)))
+    db.info.setdefault(PENDING_REVOCATIONS, []).append(("subject", subject, _epoch(now)))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_revocations(session):
+    for kind, key, revoked_at in session.info.pop(PENDING_REVOCATIONS, ()):
+        if kind == "jti":
+            revocation_list.add_jti(key)
+        else:
+            revocation_list.add_subject(key, revoked_at)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_revocations(session):
+    session.info.pop(PENDING_REVOCATIONS, None)